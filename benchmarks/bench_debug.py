@@ -0,0 +1,63 @@
+
+#
+# Copyright (c) 2025 Darian Marvel. See LICENSE
+#
+# Measures the per-call cost of `debug()` and `debug_lazy()`
+# with the debug channel turned on and off.
+#
+# Run from the repository root: `python benchmarks/bench_debug.py`
+#
+
+import os
+import sys
+import io
+import timeit
+import contextlib
+
+os.environ.setdefault("LOG_FILE", os.devnull)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import bot
+
+CHANNEL = "bench"
+ITERATIONS = 200000
+
+
+def time_per_call(statement) -> float:
+    total = timeit.timeit(statement, number = ITERATIONS)
+    return total / ITERATIONS * 1e9
+
+
+def run_cases() -> list[tuple[str, float]]:
+    user_id = 123456789012345678
+    server_id = 876543210987654321
+    permission = "quiz_create"
+
+    return [
+        ("debug (f-string)", time_per_call(
+            lambda: bot.debug(CHANNEL, f"User {user_id} has permission '{permission}' in server {server_id}: {True}"))),
+        ("debug_lazy (format args)", time_per_call(
+            lambda: bot.debug_lazy(CHANNEL, "User {} has permission '{}' in server {}: {}", user_id, permission, server_id, True))),
+        ("debug_lazy (callable)", time_per_call(
+            lambda: bot.debug_lazy(CHANNEL, lambda: f"User {user_id} has permission '{permission}' in server {server_id}: {True}"))),
+    ]
+
+
+def main():
+    bot.register_debug_channel(CHANNEL)
+
+    bot.set_debug_channel_value(CHANNEL, False)
+    disabled = run_cases()
+
+    bot.set_debug_channel_value(CHANNEL, True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        enabled = run_cases()
+
+    print(f"ALWAYS_DEBUG = {bot.ALWAYS_DEBUG}, {ITERATIONS} calls per case")
+    print(f"{'case':<28} {'off (ns/call)':>14} {'on (ns/call)':>14}")
+    for (name, off), (_, on) in zip(disabled, enabled):
+        print(f"{name:<28} {off:>14.1f} {on:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
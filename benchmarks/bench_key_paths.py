@@ -0,0 +1,55 @@
+
+#
+# Copyright (c) 2025 Darian Marvel. See LICENSE
+#
+# Measures the permission check path (`user_has_permission_in_server()`).
+# "hot" repeats checks for a small set of active users, which are
+# answered from caches, "cold" spreads them over every user in the tree.
+#
+# Run from the repository root: `python benchmarks/bench_key_paths.py [servers]`
+#
+
+import os
+import sys
+import random
+import timeit
+
+os.environ.setdefault("LOG_FILE", os.devnull)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import bot
+from bench_storage_backends import build_tree, USERS_PER_SERVER
+
+ITERATIONS = 200000
+HOT_USERS = 500
+
+
+def time_per_check(pairs: list) -> float:
+    count = len(pairs)
+    index = [0]
+
+    def check():
+        server_id, user_id = pairs[index[0] % count]
+        index[0] += 1
+        bot.user_has_permission_in_server(user_id, server_id, "quiz_create")
+
+    return timeit.timeit(check, number = ITERATIONS) / ITERATIONS * 1e9
+
+
+def main():
+    server_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    bot.main_bot_data = bot.JsonDictionary(name = "bench", dictionary = build_tree(server_count))
+    bot.permission_engine.attach(bot.main_bot_data)
+
+    random.seed(1)
+    every_user = [(server_id, user_id) for server_id in range(server_count) for user_id in range(USERS_PER_SERVER)]
+    random.shuffle(every_user)
+    hot = every_user[:HOT_USERS]
+
+    print(f"{server_count} servers, {len(every_user)} users, {ITERATIONS} checks per case")
+    print(f"{'hot (' + str(HOT_USERS) + ' users), ns/check':<32} {time_per_check(hot):>10.0f}")
+    print(f"{'cold (every user), ns/check':<32} {time_per_check(every_user):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+
+#
+# Copyright (c) 2025 Darian Marvel. See LICENSE
+#
+# Compares the data file formats on a large synthetic tree:
+# how long a full save and load take, and how big the file is.
+#
+# Run from the repository root: `python benchmarks/bench_serializers.py [servers]`
+#
+
+import os
+import sys
+import time
+import tempfile
+
+os.environ.setdefault("LOG_FILE", os.devnull)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import bot
+from bench_storage_backends import build_tree
+
+REPEATS = 5
+
+
+def best_time(function) -> float:
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    server_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    tree = build_tree(server_count)
+
+    print(f"{server_count} servers, best of {REPEATS}")
+    print(f"{'format':<14} {'save (ms)':>12} {'load (ms)':>12} {'size (KiB)':>12}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, serializer in bot.DATA_SERIALIZERS.items():
+            file_name = os.path.join(temp_dir, f"data.{name}")
+
+            save = best_time(lambda: bot.write_data_file_atomic(tree, file_name, serializer))
+            load = best_time(lambda: bot.read_data_file(file_name))
+            assert bot.read_data_file(file_name) == tree
+
+            print(f"{name:<14} {save * 1e3:>12.1f} {load * 1e3:>12.1f} {os.path.getsize(file_name) / 1024:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+
+#
+# Copyright (c) 2025 Darian Marvel. See LICENSE
+#
+# Compares the JSON file and SQLite data backends on a large synthetic tree:
+# how long it takes to persist a single change, and how fast values and
+# sub-dictionaries can be read back.
+#
+# Run from the repository root: `python benchmarks/bench_storage_backends.py [servers]`
+#
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+
+os.environ.setdefault("LOG_FILE", os.devnull)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import bot
+
+USERS_PER_SERVER = 20
+OPERATIONS = 2000
+
+
+def build_tree(server_count: int) -> dict:
+    servers = {}
+    for server_id in range(server_count):
+        users = {}
+        for user_id in range(USERS_PER_SERVER):
+            users[str(user_id)] = {"permissions": {"is_admin": user_id == 0, "quiz_create": user_id % 3 == 0}}
+        servers[str(server_id)] = {"users": users}
+    return {"servers": servers, "debug": {"type": {"http": False}}}
+
+
+def random_permission_key(server_count: int) -> str:
+    return f"servers.{random.randrange(server_count)}.users.{random.randrange(USERS_PER_SERVER)}.permissions.quiz_create"
+
+
+def random_permissions_prefix(server_count: int) -> str:
+    return f"servers.{random.randrange(server_count)}.users.{random.randrange(USERS_PER_SERVER)}.permissions"
+
+
+def time_per_op(function, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    server_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    tree = build_tree(server_count)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_file = os.path.join(temp_dir, "data.json")
+        sqlite_file = os.path.join(temp_dir, "data.sqlite3")
+
+        json_dictionary = bot.JsonDictionary(name = "bench", dictionary = json.loads(json.dumps(tree)))
+
+        start = time.perf_counter()
+        bot.write_json_data_atomic(json_dictionary.get_dictionary(), json_file)
+        json_save = time.perf_counter() - start
+
+        sqlite_dictionary = bot.SqliteDictionary(name = "bench", file_name = sqlite_file)
+        start = time.perf_counter()
+        rows = sqlite_dictionary.import_tree(tree)
+        sqlite_import = time.perf_counter() - start
+
+        json_set = time_per_op(lambda: json_dictionary.dictionary_set(random_permission_key(server_count), True), OPERATIONS)
+        sqlite_set = time_per_op(lambda: sqlite_dictionary.dictionary_set(random_permission_key(server_count), True), OPERATIONS)
+
+        json_get = time_per_op(lambda: json_dictionary.dictionary_get(random_permission_key(server_count)), OPERATIONS)
+        sqlite_get = time_per_op(lambda: sqlite_dictionary.dictionary_get(random_permission_key(server_count)), OPERATIONS)
+
+        json_prefix = time_per_op(lambda: json_dictionary.dictionary_get(random_permissions_prefix(server_count)), OPERATIONS)
+        sqlite_prefix = time_per_op(lambda: sqlite_dictionary.dictionary_get(random_permissions_prefix(server_count)), OPERATIONS)
+
+        json_size = os.path.getsize(json_file)
+        sqlite_dictionary.checkpoint()
+        sqlite_size = os.path.getsize(sqlite_file)
+        sqlite_dictionary.close()
+
+    print(f"{server_count} servers, {USERS_PER_SERVER} users each, {rows} leaf values")
+    print(f"{'':<36} {'json':>12} {'sqlite':>12}")
+    print(f"{'persist one change (ms)':<36} {json_save * 1e3:>12.2f} {sqlite_set * 1e3:>12.3f}")
+    print(f"{'in-memory set (us)':<36} {json_set * 1e6:>12.2f} {'-':>12}")
+    print(f"{'get leaf (us)':<36} {json_get * 1e6:>12.2f} {sqlite_get * 1e6:>12.2f}")
+    print(f"{'get permissions sub-dict (us)':<36} {json_prefix * 1e6:>12.2f} {sqlite_prefix * 1e6:>12.2f}")
+    print(f"{'file size (KiB)':<36} {json_size / 1024:>12.0f} {sqlite_size / 1024:>12.0f}")
+    print(f"sqlite import of the whole tree: {sqlite_import:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
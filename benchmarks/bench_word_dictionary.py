@@ -0,0 +1,89 @@
+
+#
+# Copyright (c) 2025 Darian Marvel. See LICENSE
+#
+# Compares the packed `WordDictionary` with a plain list and a set of
+# strings for a large synthetic word list: memory used, load time and
+# how long checking whether a word is in the list takes. Also times
+# picking a random word with a length range and difficulty.
+#
+# Run from the repository root: `python benchmarks/bench_word_dictionary.py [words]`
+#
+
+import os
+import sys
+import time
+import random
+import string
+import timeit
+import tempfile
+import tracemalloc
+
+os.environ.setdefault("LOG_FILE", os.devnull)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import bot
+
+LOOKUPS = 20000
+
+
+def write_words(file_name: str, count: int) -> None:
+    random.seed(1)
+    with open(file_name, "w") as f:
+        for _ in range(count):
+            length = random.randint(3, 12)
+            f.write("".join(random.choices(string.ascii_lowercase, k = length)) + "\n")
+
+
+# Timed without tracemalloc, which slows down code that allocates a lot
+def measure(function):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def load_list(file_name: str) -> list:
+    words = []
+    with open(file_name) as f:
+        for line in f:
+            words.append(line.rstrip())
+    return words
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "words.txt")
+        write_words(file_name, count)
+
+        words_list, list_load, list_size = measure(lambda: load_list(file_name))
+        words_set, set_load, set_size = measure(lambda: set(load_list(file_name)))
+        dictionary, dictionary_load, dictionary_size = measure(lambda: bot.WordDictionary.load(file_name))
+
+    present = random.sample(words_list, LOOKUPS)
+    absent = ["".join(random.choices(string.ascii_lowercase, k = 5)) for _ in range(LOOKUPS)]
+    lookups = present + absent
+
+    list_lookup = timeit.timeit(lambda: [word in words_list for word in lookups[:200]], number = 1) / 200
+    set_lookup = timeit.timeit(lambda: [word in words_set for word in lookups], number = 1) / len(lookups)
+    dictionary_lookup = timeit.timeit(lambda: [word in dictionary for word in lookups], number = 1) / len(lookups)
+
+    print(f"{count} lines, {len(dictionary)} distinct words in {len(dictionary.get_lengths())} lengths")
+    print(f"{'':<24} {'list':>12} {'set':>12} {'packed':>12}")
+    print(f"{'memory (MiB)':<24} {list_size / 2**20:>12.1f} {set_size / 2**20:>12.1f} {dictionary_size / 2**20:>12.1f}")
+    print(f"{'load (s)':<24} {list_load:>12.2f} {set_load:>12.2f} {dictionary_load:>12.2f}")
+    print(f"{'membership (us)':<24} {list_lookup * 1e6:>12.1f} {set_lookup * 1e6:>12.2f} {dictionary_lookup * 1e6:>12.2f}")
+
+    pick = timeit.timeit(lambda: dictionary.pick_word(4, 9, "medium", exclude = absent[:50]), number = LOOKUPS) / LOOKUPS
+    print(f"random word, lengths 4-9, medium difficulty, 50 excluded: {pick * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+
+#
+# Copyright (c) 2025 Darian Marvel. See LICENSE
+#
+# Checks the Wordle scorer against known duplicate-letter cases, then
+# compares rendering the board the old way (scoring every earlier guess
+# again on every turn) with keeping each scored row.
+#
+# Run from the repository root: `python benchmarks/bench_wordle.py`
+#
+
+import os
+import sys
+import random
+import string
+import timeit
+
+os.environ.setdefault("LOG_FILE", os.devnull)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import bot
+
+# (word, guess, expected score): G = correct, Y = present, . = absent
+DUPLICATE_LETTER_CASES = [
+    ("abbey", "keeps", ".Y..."),
+    ("abbey", "babes", "YYGG."),
+    ("crane", "eerie", "..Y.G"),
+    ("hello", "lolly", ".YGG."),
+    ("speed", "abide", "...YY"),
+    ("speed", "erase", "Y..YY"),
+    ("river", "error", "YY..G"),
+    ("mummy", "maxim", "G...Y"),
+    ("boost", "books", "GGG.Y"),
+    ("apple", "papal", "YYG.Y"),
+    ("llama", "allay", "YGYY."),
+    ("geese", "eerie", "YG..G"),
+    ("sassy", "asses", "YYG.Y"),
+    ("robot", "boooo", "YG.G."),
+    ("aaaab", "baaaa", "YGGGY"),
+    ("abcde", "aaaaa", "G...."),
+]
+
+SCORE_LETTERS = {bot.WORDLE_ABSENT: ".", bot.WORDLE_PRESENT: "Y", bot.WORDLE_CORRECT: "G"}
+
+GAMES = 2000
+GUESSES_PER_GAME = 6
+
+
+def old_generate_wordle_guess_response(word: str, guess: str):
+    response = ""
+    for i in range(0, len(guess)):
+        if guess[i] == word[i]:
+            response += bot.EMOJI_GREEN_SQUARE
+        elif guess[i] in word:
+            response += bot.EMOJI_YELLOW_SQUARE
+        else:
+            response += bot.EMOJI_BLACK_SQUARE
+    return response
+
+
+def check_corpus() -> int:
+    failures = 0
+    old_wrong = 0
+    for word, guess, expected in DUPLICATE_LETTER_CASES:
+        result = "".join([SCORE_LETTERS[score] for score in bot.score_wordle_guess(word, guess)])
+        if result != expected:
+            print(f"FAIL {word} / {guess}: expected {expected}, got {result}")
+            failures += 1
+
+        expected_emojis = "".join([bot.WORDLE_SCORE_EMOJIS[".YG".index(letter)] for letter in expected])
+        if old_generate_wordle_guess_response(word, guess) != expected_emojis:
+            old_wrong += 1
+
+    print(f"{len(DUPLICATE_LETTER_CASES)} duplicate-letter cases, {failures} failed, the old scorer got {old_wrong} wrong")
+    return failures
+
+
+def play_old(word: str, guesses: list) -> None:
+    guessed = []
+    for word_guess in guesses:
+        guessed.append(word_guess)
+        result_lines = []
+        for guess in guessed:
+            result_lines.append(f"`{guess}` - `{old_generate_wordle_guess_response(word, guess)}`")
+        "\n".join(result_lines)
+
+
+def play_new(word: str, guesses: list) -> None:
+    rows = []
+    for word_guess in guesses:
+        rows.append(bot.generate_wordle_board_row(word, word_guess))
+        "\n".join(rows)
+
+
+def main():
+    failures = check_corpus()
+
+    random.seed(1)
+    games = []
+    for _ in range(GAMES):
+        word = "".join(random.choices(string.ascii_lowercase, k = 5))
+        games.append((word, ["".join(random.choices(string.ascii_lowercase, k = 5)) for _ in range(GUESSES_PER_GAME)]))
+
+    old = timeit.timeit(lambda: [play_old(word, guesses) for word, guesses in games], number = 3) / 3 / GAMES
+    new = timeit.timeit(lambda: [play_new(word, guesses) for word, guesses in games], number = 3) / 3 / GAMES
+    print(f"{GUESSES_PER_GAME}-guess game, board rendered every turn:")
+    print(f"{'rescore every row (us/game)':<32} {old * 1e6:>8.1f}")
+    print(f"{'keep scored rows (us/game)':<32} {new * 1e6:>8.1f}")
+
+    sys.exit(1 if failures > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
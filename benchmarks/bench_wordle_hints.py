@@ -0,0 +1,94 @@
+
+#
+# Copyright (c) 2025 Darian Marvel. See LICENSE
+#
+# Builds the Wordle hint matrix for a synthetic list of five letter
+# words and measures the build, the size of the matrix, how long opening
+# the cached file takes, and how long a hint takes at each turn of games
+# played by always taking the hint.
+#
+# Run from the repository root: `python benchmarks/bench_wordle_hints.py [words] [games]`
+#
+
+import os
+import sys
+import time
+import random
+import tempfile
+import tracemalloc
+
+os.environ.setdefault("LOG_FILE", os.devnull)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import bot
+
+# Roughly the letter frequencies of English, so answers share letters like real ones do
+LETTERS = "eeeeeeeeeeeeaaaaaaaaarrrrrrrriiiiiiiiooooooootttttttnnnnnnnsssssslllllcccccuuuuddddppppmmmhhhggbbffyywkvxzjq"
+
+
+def write_words(file_name: str, count: int) -> None:
+    random.seed(1)
+    words = set()
+    while len(words) < count:
+        words.add("".join(random.choices(LETTERS, k = 5)))
+    with open(file_name, "w") as f:
+        for word in words:
+            f.write(word + "\n")
+
+
+def play(hints, matrix, channel_id: int, word: str, timings: dict) -> int:
+    guessed = []
+    while True:
+        start = time.perf_counter()
+        remaining, suggestion = hints.get_hint(matrix, channel_id, word, guessed)
+        guess = matrix.bucket.get_word(suggestion)
+        timings.setdefault(len(guessed), []).append(time.perf_counter() - start)
+        guessed.append(guess)
+        if guess == word:
+            return len(guessed)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 13000
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        words_file = os.path.join(temp_dir, "words.txt")
+        write_words(words_file, count)
+        bot.WORDLE_HINT_CACHE_DIR = os.path.join(temp_dir, "cache")
+        dictionary = bot.WordDictionary.load(words_file)
+
+        start = time.perf_counter()
+        matrix = bot.WordleHints(dictionary).open_or_build(5)
+        build = time.perf_counter() - start
+        file_size = os.path.getsize(matrix.file_name)
+
+        hints = bot.WordleHints(dictionary)
+        tracemalloc.start()
+        start = time.perf_counter()
+        opened = hints.open_cached()
+        open_time = time.perf_counter() - start
+        heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        matrix = hints.matrices[5]
+
+        random.seed(2)
+        timings = {}
+        turns = []
+        for channel_id in range(games):
+            turns.append(play(hints, matrix, channel_id, dictionary.random_word(5), timings))
+
+        print(f"{len(dictionary)} five letter words, opener `{matrix.bucket.get_word(matrix.best_opener)}`")
+        print(f"build {build:.1f}s, matrix file {file_size / 2**20:.1f} MiB")
+        print(f"open {opened} cached matrix: {open_time * 1e3:.2f} ms, {heap / 1024:.1f} KiB of Python memory")
+        print(f"{games} games solved in {sum(turns) / len(turns):.2f} guesses on average, {max(turns)} at most")
+        print(f"{'hint before guess':<20} {'hints':>6} {'mean (ms)':>10} {'max (ms)':>10}")
+        for turn in sorted(timings.keys()):
+            values = timings[turn]
+            print(f"{turn + 1:<20} {len(values):>6} {sum(values) / len(values) * 1e3:>10.2f} {max(values) * 1e3:>10.2f}")
+
+        del hints, matrix
+
+
+if __name__ == "__main__":
+    main()
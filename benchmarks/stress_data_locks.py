@@ -0,0 +1,130 @@
+
+#
+# Copyright (c) 2025 Darian Marvel. See LICENSE
+#
+# Stress test for the sub-tree locks: hundreds of coroutines do
+# read-modify-write updates of shared game channels, awaiting in the
+# middle like a command waiting on Discord, while a thread keeps saving
+# the data and other threads read it. Every update must survive, every
+# read must see a consistent sub-tree, and the event loop must never
+# be blocked for long.
+#
+# Run from the repository root: `python benchmarks/stress_data_locks.py [--no-locks]`
+#
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+
+os.environ.setdefault("LOG_FILE", os.devnull)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import bot
+
+WRITERS = 400
+UPDATES_PER_WRITER = 25
+CHANNELS = 20
+READER_THREADS = 2
+
+
+def channel_key(channel: int) -> str:
+    return f"hangman.{channel}"
+
+
+async def update_game(dictionary, key: str, writer_id: int) -> None:
+    game = dictionary.dictionary_get_copy(key)
+    # Waiting on Discord
+    await asyncio.sleep(0)
+    with dictionary.batch() as batch:
+        batch.set(f"{key}.count", game["count"] + 1)
+        batch.set(f"{key}.guessed", game["guessed"] + [writer_id])
+
+
+async def writer(dictionary, writer_id: int, use_locks: bool) -> None:
+    for update in range(UPDATES_PER_WRITER):
+        key = channel_key((writer_id + update) % CHANNELS)
+        if use_locks is True:
+            async with dictionary.subtree_locks.writing(key):
+                await update_game(dictionary, key, writer_id)
+        else:
+            await update_game(dictionary, key, writer_id)
+
+
+def serializer(dictionary, file_name: str, stop: threading.Event, stats: dict) -> None:
+    while stop.is_set() is False:
+        dictionary.checkpoint(file_name, bot.DATA_SERIALIZERS["json_compact"])
+        stats["saves"] += 1
+
+
+def reader(dictionary, stop: threading.Event, stats: dict) -> None:
+    channel = 0
+    while stop.is_set() is False:
+        key = channel_key(channel % CHANNELS)
+        with dictionary.subtree_locks.reading(key):
+            game = dictionary.dictionary_get_copy(key)
+        if game["count"] != len(game["guessed"]):
+            stats["inconsistent_reads"] += 1
+        stats["reads"] += 1
+        channel += 1
+
+
+async def measure_loop_lag(stop: asyncio.Event, stats: dict) -> None:
+    while stop.is_set() is False:
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        stats["max_loop_lag"] = max(stats["max_loop_lag"], time.perf_counter() - start - 0.001)
+
+
+async def run(use_locks: bool) -> int:
+    dictionary = bot.JsonDictionary(name = "stress")
+    for channel in range(CHANNELS):
+        dictionary.dictionary_set(f"{channel_key(channel)}.count", 0)
+        dictionary.dictionary_set(f"{channel_key(channel)}.guessed", [])
+
+    stats = {"saves": 0, "reads": 0, "inconsistent_reads": 0, "max_loop_lag": 0.0}
+    stop_threads = threading.Event()
+    stop_lag = asyncio.Event()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "data.json")
+        threads = [threading.Thread(target = serializer, args = (dictionary, file_name, stop_threads, stats))]
+        for _ in range(READER_THREADS):
+            threads.append(threading.Thread(target = reader, args = (dictionary, stop_threads, stats)))
+        for thread in threads:
+            thread.start()
+
+        lag_task = asyncio.create_task(measure_loop_lag(stop_lag, stats))
+        start = time.perf_counter()
+        await asyncio.gather(*[writer(dictionary, writer_id, use_locks) for writer_id in range(WRITERS)])
+        elapsed = time.perf_counter() - start
+
+        stop_lag.set()
+        await lag_task
+        stop_threads.set()
+        for thread in threads:
+            thread.join()
+
+        dictionary.checkpoint(file_name, bot.DATA_SERIALIZERS["json_compact"])
+        saved = bot.read_data_file(file_name)
+
+    expected = WRITERS * UPDATES_PER_WRITER
+    total = sum(dictionary.dictionary_get(f"{channel_key(channel)}.count") for channel in range(CHANNELS))
+    saved_total = sum(saved["hangman"][str(channel)]["count"] for channel in range(CHANNELS))
+
+    print(f"locks: {use_locks}, {WRITERS} writers x {UPDATES_PER_WRITER} updates over {CHANNELS} channels in {elapsed:.2f}s")
+    print(f"updates kept: {total}/{expected}, in saved file: {saved_total}/{expected}")
+    print(f"background saves: {stats['saves']}, thread reads: {stats['reads']}, inconsistent reads: {stats['inconsistent_reads']}")
+    print(f"max event loop lag: {stats['max_loop_lag'] * 1e3:.1f} ms")
+
+    if total != expected or saved_total != expected or stats["inconsistent_reads"] > 0:
+        print("FAILED")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run("--no-locks" not in sys.argv)))
@@ -5,33 +5,63 @@
 # `rootcellar` on Discord.
 #
 
+import time
+
+# Taken before anything else is imported, so the startup report covers imports
+STARTUP_PERF_COUNTER = time.perf_counter()
+
 import os
+import sys
 import shutil
 import re
 import json
-import requests
+import marshal
+import math
+import sqlite3
 import random
+import bisect
+import struct
+import mmap
+import array
+import operator
 import datetime
+import functools
+import itertools
 
 import threading
+import weakref
+import queue
+import gzip
+import hashlib
+import lzma
+import zlib
+import atexit
 
 import asyncio
 from asyncio import Lock
+from collections import deque, OrderedDict, Counter
+
+import aiohttp
 
 import discord
 from discord.ext import commands
 
 from dotenv import load_dotenv
-from requests import JSONDecodeError
 
 load_dotenv()
 
+
+def get_env_bool(name: str, default: str) -> bool:
+    value = os.getenv(name, default = default)
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 #
 # ENVIRONMENT VARIABLES
 #
 
-ALWAYS_DEBUG = bool(os.getenv('ALWAYS_DEBUG', default = 'False'))
-DEFAULT_DEBUG_CHANNEL_STATUS = bool(os.getenv('DEFAULT_DEBUG_CHANNEL_STATUS', default = 'False'))
+ALWAYS_DEBUG = get_env_bool('ALWAYS_DEBUG', default = 'False')
+DEFAULT_DEBUG_CHANNEL_STATUS = get_env_bool('DEFAULT_DEBUG_CHANNEL_STATUS', default = 'False')
 
 BOT_NAME = os.getenv('BOT_NAME', default = 'unnamed')
 BOT_ICON_URL = os.getenv('BOT_ICON_URL', default = '')
@@ -40,8 +70,77 @@ COMMAND_PREFIX = os.getenv('COMMAND_PREFIX', default = '!')
 DEFAULT_STATUS = os.getenv('DEFAULT_STATUS', default = '')
 DEFAULT_STATUS_MESSAGE = os.getenv('DEFAULT_STATUS_MESSAGE', default = '')
 ADMIN_USERNAMES = os.getenv('ADMIN_USERNAMES', default = '')
+ADMIN_USER_IDS = os.getenv('ADMIN_USER_IDS', default = '')
+PERMISSION_CACHE_SIZE = int(os.getenv('PERMISSION_CACHE_SIZE', default = '10000'))
 
 WORDLE_WORDS_FILE = os.getenv('WORDLE_WORDS_FILE', default = '')
+GAME_SESSION_TTL_SECONDS = float(os.getenv('GAME_SESSION_TTL_SECONDS', default = '604800'))
+GAME_SWEEP_INTERVAL_SECONDS = float(os.getenv('GAME_SWEEP_INTERVAL_SECONDS', default = '3600'))
+GAME_ARCHIVE_FILE = os.getenv('GAME_ARCHIVE_FILE', default = '')
+
+WORDLE_VALIDATE_GUESSES = get_env_bool('WORDLE_VALIDATE_GUESSES', default = 'True')
+WORDLE_HINT_CACHE_DIR = os.getenv('WORDLE_HINT_CACHE_DIR', default = 'wordle_hint_cache')
+WORDLE_HINT_MAX_WORDS = int(os.getenv('WORDLE_HINT_MAX_WORDS', default = '15000'))
+
+DATA_JOURNAL_ENABLED = get_env_bool('DATA_JOURNAL_ENABLED', default = 'True')
+DATA_JOURNAL_COMMIT_INTERVAL_SECONDS = float(os.getenv('DATA_JOURNAL_COMMIT_INTERVAL_SECONDS', default = '0.1'))
+DATA_JOURNAL_COMPACT_BYTES = int(os.getenv('DATA_JOURNAL_COMPACT_BYTES', default = '8388608'))
+
+DATA_BACKEND = os.getenv('DATA_BACKEND', default = 'json')
+DATA_SQLITE_FILE = os.getenv('DATA_SQLITE_FILE', default = 'main_bot_data.sqlite3')
+
+DATA_FILE_FORMAT = os.getenv('DATA_FILE_FORMAT', default = 'json')
+DATA_FILE_COMPACT = get_env_bool('DATA_FILE_COMPACT', default = 'False')
+DATA_AUTOSAVE_INTERVAL_SECONDS = float(os.getenv('DATA_AUTOSAVE_INTERVAL_SECONDS', default = '300'))
+
+DATA_BACKUP_DIR = os.getenv('DATA_BACKUP_DIR', default = 'discord_bot_data_backups')
+DATA_BACKUP_COMPRESSION = os.getenv('DATA_BACKUP_COMPRESSION', default = 'lzma')
+DATA_BACKUP_KEEP_LATEST = int(os.getenv('DATA_BACKUP_KEEP_LATEST', default = '5'))
+DATA_BACKUP_KEEP_HOURLY = int(os.getenv('DATA_BACKUP_KEEP_HOURLY', default = '24'))
+DATA_BACKUP_KEEP_DAILY = int(os.getenv('DATA_BACKUP_KEEP_DAILY', default = '7'))
+DATA_BACKUP_KEEP_WEEKLY = int(os.getenv('DATA_BACKUP_KEEP_WEEKLY', default = '8'))
+
+DATA_SHARDS_ENABLED = get_env_bool('DATA_SHARDS_ENABLED', default = 'True')
+DATA_SHARD_DIR = os.getenv('DATA_SHARD_DIR', default = 'main_bot_data_shards')
+DATA_SHARD_CACHE_SIZE = int(os.getenv('DATA_SHARD_CACHE_SIZE', default = '256'))
+KEY_PATH_CACHE_SIZE = int(os.getenv('KEY_PATH_CACHE_SIZE', default = '4096'))
+
+LOG_FILE = os.getenv('LOG_FILE', default = 'info.log')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', default = '10000'))
+LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv('LOG_FLUSH_INTERVAL_SECONDS', default = '1.0'))
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', default = '0'))
+LOG_ROTATE_INTERVAL_SECONDS = int(os.getenv('LOG_ROTATE_INTERVAL_SECONDS', default = '0'))
+LOG_COMPRESS_ROTATED = get_env_bool('LOG_COMPRESS_ROTATED', default = 'False')
+
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv('HTTP_CONNECT_TIMEOUT_SECONDS', default = '5'))
+HTTP_READ_TIMEOUT_SECONDS = float(os.getenv('HTTP_READ_TIMEOUT_SECONDS', default = '10'))
+HTTP_TOTAL_TIMEOUT_SECONDS = float(os.getenv('HTTP_TOTAL_TIMEOUT_SECONDS', default = '15'))
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', default = '32'))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', default = '4'))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv('HTTP_KEEPALIVE_SECONDS', default = '30'))
+
+RESPONSE_CACHE_FILE = os.getenv('RESPONSE_CACHE_FILE', default = '')
+RESPONSE_CACHE_POOL_SIZE = int(os.getenv('RESPONSE_CACHE_POOL_SIZE', default = '50'))
+RESPONSE_CACHE_MAX_STALE_SECONDS = float(os.getenv('RESPONSE_CACHE_MAX_STALE_SECONDS', default = '86400'))
+JOKE_CACHE_TTL_SECONDS = float(os.getenv('JOKE_CACHE_TTL_SECONDS', default = '0'))
+QUOTE_CACHE_TTL_SECONDS = float(os.getenv('QUOTE_CACHE_TTL_SECONDS', default = '60'))
+NO_CACHE_TTL_SECONDS = float(os.getenv('NO_CACHE_TTL_SECONDS', default = '0'))
+
+JOKE_COALESCE_REQUESTS = get_env_bool('JOKE_COALESCE_REQUESTS', default = 'True')
+QUOTE_COALESCE_REQUESTS = get_env_bool('QUOTE_COALESCE_REQUESTS', default = 'True')
+NO_COALESCE_REQUESTS = get_env_bool('NO_COALESCE_REQUESTS', default = 'True')
+IMAGE_COALESCE_REQUESTS = get_env_bool('IMAGE_COALESCE_REQUESTS', default = 'False')
+
+API_DEADLINE_SECONDS = float(os.getenv('API_DEADLINE_SECONDS', default = '8'))
+IMAGE_API_DEADLINE_SECONDS = float(os.getenv('IMAGE_API_DEADLINE_SECONDS', default = '5'))
+API_HEDGE_REQUESTS = get_env_bool('API_HEDGE_REQUESTS', default = 'False')
+IMAGE_API_HEDGE_REQUESTS = get_env_bool('IMAGE_API_HEDGE_REQUESTS', default = 'False')
+API_BREAKER_FAILURE_THRESHOLD = int(os.getenv('API_BREAKER_FAILURE_THRESHOLD', default = '5'))
+API_BREAKER_OPEN_SECONDS = float(os.getenv('API_BREAKER_OPEN_SECONDS', default = '30'))
+
+IMAGE_PREFETCH_DEPTH = int(os.getenv('IMAGE_PREFETCH_DEPTH', default = '5'))
+IMAGE_PREFETCH_CONCURRENCY = int(os.getenv('IMAGE_PREFETCH_CONCURRENCY', default = '2'))
+IMAGE_PREFETCH_MAX_AGE_SECONDS = float(os.getenv('IMAGE_PREFETCH_MAX_AGE_SECONDS', default = '1800'))
 
 #
 # CONSTANTS
@@ -49,6 +148,26 @@ WORDLE_WORDS_FILE = os.getenv('WORDLE_WORDS_FILE', default = '')
 
 DEBUG_CHANNEL_DICT_PATH = "debug.type"
 
+# Channels whose remaining Wordle answers are remembered between hints
+WORDLE_HINT_SESSIONS_KEPT = 256
+
+# Game sessions kept in memory per game, the rest are loaded again when played
+GAME_SESSIONS_KEPT = 1024
+
+# Random words aren't picked again until this many others have been used in the channel
+RECENT_WORDS_PER_CHANNEL = 50
+RECENT_WORDS_CHANNELS_KEPT = 1024
+
+WORD_DIFFICULTIES = ("easy", "medium", "hard")
+
+JOKE_API_URL = "https://v2.jokeapi.dev/joke/Any?blacklistFlags=nsfw,religious,political,racist,sexist,explicit"
+QUOTE_API_URL = "https://zenquotes.io/api/random"
+NO_API_URL = "https://naas.isalman.dev/no"
+CAT_API_URL = "https://api.thecatapi.com/v1/images/search"
+DOG_API_URL = "https://api.thedogapi.com/v1/images/search"
+# From https://github.com/samSharivker/PenguinImageAPI
+PENGUIN_API_URL = "https://penguin.sjsharivker.workers.dev/api"
+
 INFO_DESCRIPTION = "A Discord bot that's meant to bring some extra fun into the chat with a variety of available commands and a couple games"
 INFO_USAGE = f"Use `{COMMAND_PREFIX}help` to get a list of available commands"
 INFO_REPOSITORY_URL = "[Click Here](<https://github.com/RootCellar/RootCellarBot>)"
@@ -77,6 +196,7 @@ FORTUNES = [
 ]
 
 QUIZ_VALID_NAME_PATTERN = "[a-zA-Z_]{2,}"
+QUIZ_VALID_NAME_REGEX = re.compile(QUIZ_VALID_NAME_PATTERN)
 
 ERROR_MESSAGES = [
     "huh?", "what?", "*implodes*", "no u", "AAAAAAAAAAAAAA", "I need....a penguin plushie", "whar?", "~~sanity~~",
@@ -85,6 +205,7 @@ ERROR_MESSAGES = [
 ]
 
 PERMISSION_VALID_NAME_PATTERN = "[a-zA-Z_]{2,}"
+PERMISSION_VALID_NAME_REGEX = re.compile(PERMISSION_VALID_NAME_PATTERN)
 NO_PERMISSION_ERROR_MESSAGE = "Sorry, you don't have permission to do that."
 
 #
@@ -106,10 +227,20 @@ EMOJI_GREEN_SQUARE = '\U0001F7E9'
 EMOJI_YELLOW_SQUARE = '\U0001F7E8'
 EMOJI_BLACK_SQUARE = '\U00002B1B'
 
+# How each letter of a Wordle guess is scored
+WORDLE_ABSENT = 0
+WORDLE_PRESENT = 1
+WORDLE_CORRECT = 2
+WORDLE_SCORE_EMOJIS = (EMOJI_BLACK_SQUARE, EMOJI_YELLOW_SQUARE, EMOJI_GREEN_SQUARE)
+
 EMOJI_DICE = '\U0001F3B2'
 EMOJI_PARTY_POPPER = '\U0001F389'
 
 MAIN_DATA_FILE = "main_bot_data.json"
+MAIN_DATA_JOURNAL_FILE = "main_bot_data.journal"
+
+# Top level keys whose children (one per server or channel) are each kept in their own file
+SHARDED_DATA_ROOTS = ("servers", "hangman", "wordle")
 
 #
 # GLOBAL DATA
@@ -118,7 +249,7 @@ MAIN_DATA_FILE = "main_bot_data.json"
 startup_time = datetime.datetime.now()
 data_lock = Lock()
 debug_channel_dict = {}
-wordle_words = []
+enabled_debug_channels = set()
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -147,13 +278,22 @@ def get_debug_channel_value(channel: str):
 
 def set_debug_channel_value(channel: str, value: bool) -> None:
     debug_channel_dict[channel] = value
+    if value is True:
+        enabled_debug_channels.add(channel)
+    else:
+        enabled_debug_channels.discard(channel)
 
 
-def should_log_debug_channel(channel: str):
-    value = get_debug_channel_value(channel)
+def register_debug_channel(channel: str) -> None:
+    if channel not in debug_channel_dict:
+        set_debug_channel_value(channel, DEFAULT_DEBUG_CHANNEL_STATUS)
 
-    if value is True:
+
+def should_log_debug_channel(channel: str):
+    if channel in enabled_debug_channels:
         return True
+
+    value = get_debug_channel_value(channel)
     if value is None:
         # This serves as an "automatic registration", so that
         # commands such as "prefix!debugged" will show all channels
@@ -168,6 +308,29 @@ def debug(channel: str, message: str):
         log(f"[DEBUG] {channel}: {message}")
 
 
+def format_debug_message(message, args: tuple) -> str:
+    if callable(message):
+        return message()
+    if len(args) > 0:
+        return message.format(*args)
+    return message
+
+
+#
+# Like `debug()`, but the message is only built when the channel is enabled.
+# `message` is either a callable that returns the message, or a format
+# string that is filled in with `args` using `str.format()`.
+#
+# A disabled channel costs a single set lookup. There is no automatic
+# registration here, so hot-path channels should be registered up front
+# with `register_debug_channel()` to show up in `debugged`.
+#
+def debug_lazy(channel: str, message, *args) -> None:
+    if channel not in enabled_debug_channels and ALWAYS_DEBUG is False:
+        return
+    log(f"[DEBUG] {channel}: {format_debug_message(message, args)}")
+
+
 def match_all_regex(expr: str, text: str) -> list[str]:
     return re.findall(expr, text)
 
@@ -176,11 +339,194 @@ def strip_non_ascii(text: str):
     return re.sub(r'[^\x00-\x7f]', r'?', text)
 
 
+#
+# Writes log lines to a file from a background thread.
+#
+# `write()` only puts the line on a bounded queue, so callers on the
+# event loop never touch the disk. The writer thread keeps the file open,
+# writes whatever has queued up as one batch, and rotates the file when
+# it grows past `max_bytes` or gets older than `rotate_interval` seconds.
+# Lines that arrive while the queue is full are dropped and counted.
+#
+class LogWriter(object):
+    STOP = object()
+    MAX_BATCH_LINES = 1024
+
+    def __init__(self, file_name: str, queue_size: int = 10000, flush_interval: float = 1.0,
+                 max_bytes: int = 0, rotate_interval: int = 0, compress_rotated: bool = False):
+        self.file_name = file_name
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.compress_rotated = compress_rotated
+
+        self.queue = queue.Queue(maxsize = queue_size)
+        self.counter_lock = threading.Lock()
+        self.thread = None
+        self.file = None
+        self.opened_at = 0.0
+
+        self.written_count = 0
+        self.batch_count = 0
+        self.dropped_count = 0
+        self.dropped_unreported = 0
+        self.rotated_count = 0
+
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self.thread = threading.Thread(target = self.run, name = "log-writer", daemon = True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.is_running() is False:
+            return
+        # Blocking put, so the stop marker is never dropped and
+        # every line queued before it still gets written
+        self.queue.put(LogWriter.STOP)
+        self.thread.join()
+        self.thread = None
+
+    def write(self, line: str) -> None:
+        if self.is_running() is False:
+            with open(self.file_name, 'a') as file:
+                file.write(line)
+            return
+
+        try:
+            self.queue.put_nowait(line)
+        except queue.Full:
+            with self.counter_lock:
+                self.dropped_count += 1
+                self.dropped_unreported += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written_count,
+            "batches": self.batch_count,
+            "dropped": self.dropped_count,
+            "rotated": self.rotated_count,
+        }
+
+    def open_file(self) -> None:
+        self.file = open(self.file_name, 'a')
+        self.opened_at = time.monotonic()
+
+    def should_rotate(self) -> bool:
+        if self.max_bytes > 0 and self.file.tell() >= self.max_bytes:
+            return True
+        if self.rotate_interval > 0 and time.monotonic() - self.opened_at >= self.rotate_interval:
+            return True
+        return False
+
+    # Logs a problem with the log file itself from the writer thread,
+    # which can't call `log()` without waiting on its own queue
+    def report(self, message: str) -> None:
+        message_to_write = generate_log_message(f"[LOG] {message}")
+        print(message_to_write, file = sys.stderr)
+        self.write(f"{message_to_write} \n")
+
+    def rotate(self) -> None:
+        self.file.close()
+        failure = None
+
+        time_formatted = format_datetime_all_dashes(datetime.datetime.now())
+        rotated_name = f"{self.file_name}-{time_formatted}"
+        suffix = 1
+        while os.path.exists(rotated_name) or os.path.exists(f"{rotated_name}.gz"):
+            rotated_name = f"{self.file_name}-{time_formatted}-{suffix}"
+            suffix += 1
+        try:
+            os.replace(self.file_name, rotated_name)
+            if self.compress_rotated is True:
+                with open(rotated_name, 'rb') as src, gzip.open(f"{rotated_name}.gz", 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(rotated_name)
+            self.rotated_count += 1
+        except OSError as error:
+            failure = f"Failed to rotate {self.file_name}: {error}"
+
+        self.open_file()
+        if failure is not None:
+            self.report(failure)
+
+    # Returns the lines to write, how many of them came from the queue,
+    # and whether the stop marker was reached
+    def take_batch(self, first_line) -> tuple[list[str], int, bool]:
+        batch = []
+        stopping = False
+        line = first_line
+
+        while True:
+            if line is LogWriter.STOP:
+                stopping = True
+                break
+            batch.append(line)
+            if len(batch) >= LogWriter.MAX_BATCH_LINES:
+                break
+            try:
+                line = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+        line_count = len(batch)
+        with self.counter_lock:
+            dropped = self.dropped_unreported
+            self.dropped_unreported = 0
+        if dropped > 0:
+            batch.append(f"{generate_log_message(f'[LOG] Dropped {dropped} lines, the log queue was full')} \n")
+
+        return batch, line_count, stopping
+
+    def run(self) -> None:
+        self.open_file()
+        last_flush = time.monotonic()
+        stopping = False
+
+        while stopping is False:
+            try:
+                line = self.queue.get(timeout = self.flush_interval)
+            except queue.Empty:
+                self.file.flush()
+                last_flush = time.monotonic()
+                # Time-based rotation still happens while nothing is logged
+                if self.should_rotate() is True:
+                    self.rotate()
+                continue
+
+            batch, line_count, stopping = self.take_batch(line)
+            if len(batch) > 0:
+                self.file.write("".join(batch))
+                self.written_count += line_count
+                self.batch_count += 1
+
+            now = time.monotonic()
+            if stopping is True or now - last_flush >= self.flush_interval:
+                self.file.flush()
+                last_flush = now
+
+            if self.should_rotate() is True:
+                self.rotate()
+
+        self.file.close()
+        self.file = None
+
+
+log_writer = LogWriter(LOG_FILE, queue_size = LOG_QUEUE_SIZE, flush_interval = LOG_FLUSH_INTERVAL_SECONDS,
+                       max_bytes = LOG_MAX_BYTES, rotate_interval = LOG_ROTATE_INTERVAL_SECONDS,
+                       compress_rotated = LOG_COMPRESS_ROTATED)
+log_writer.start()
+atexit.register(log_writer.stop)
+
+
 def log(message: str) -> None:
     message_to_write = generate_log_message(message)
     print(message_to_write)
-    with open('info.log', 'a') as file:
-        file.write(f"{message_to_write} \n")
+    log_writer.write(f"{message_to_write} \n")
 
 
 def generate_log_message(message: str) -> str:
@@ -221,370 +567,3596 @@ def load_file_lines(file_name: str) -> list[str]:
     return lines
 
 
-def load_json_data(file_name: str) -> dict:
-    debug("json_data", f"Loading {file_name}...")
-    if os.path.exists(file_name):
-        with open(file_name, 'r') as file:
-            return json.load(file)
-    return {}
-
-
-async def save_json_data(data: dict, file_name: str) -> None:
-    debug("json_data", f"Saving {file_name}...")
-    async with data_lock:
-        with open(file_name, 'w') as file:
-            json.dump(data, file, indent = 4)
-
-
-async def backup_and_save_json_data(data: dict, file_name: str) -> None:
-    if os.path.exists(file_name):
-        try:
-            dir_name = "discord_bot_data_backups"
-            mkdir_ignore_exists(dir_name)
-            time_formatted = format_datetime_all_dashes(datetime.datetime.now())
-            dst_file_name = f"{file_name}-{time_formatted}"
-            dst_name = "discord_bot_data_backups/" + dst_file_name
-            debug("backup", f"Backing up '{file_name}' to '{dst_name}'...")
-            shutil.copyfile(file_name, dst_name)
-        except OSError as error:
-            log(f"Failed to back up {file_name}: {error}")
+class JsonDataSerializer(object):
+    def __init__(self, name: str, indent: int = None):
+        self.name = name
+        self.indent = indent
 
-    await save_json_data(data, file_name)
+    def dumps(self, data) -> bytes:
+        if self.indent is None:
+            return json.dumps(data, separators = (',', ':')).encode()
+        return json.dumps(data, indent = self.indent).encode()
 
+    def loads(self, data: bytes):
+        return json.loads(data)
 
-class JsonDictionary(object):
-    def __init__(self, name: str = "unnamed", dictionary = None):
-        if dictionary is None:
-            dictionary = dict()
 
-        self.data_structure_lock = threading.Lock()
-        self.get_and_set_lock = threading.Lock()
+#
+# A binary format that's much faster to read and write than JSON, and smaller.
+# It's Python's own `marshal` format behind a short header, so it can
+# only be read by Python, and the files must never come from anyone else.
+#
+class MarshalDataSerializer(object):
+    MAGIC = b"RCBM\x01"
 
+    def __init__(self, name: str):
         self.name = name
-        self.dictionary = dictionary
-
-    def get_string_prefix(self):
-        return f"<JsonDictionary {self.name}>"
 
-    def print_debug(self, message: str):
-        debug("dictionary", f"{self.get_string_prefix()} {message}")
+    def dumps(self, data) -> bytes:
+        return MarshalDataSerializer.MAGIC + marshal.dumps(data, 4)
 
-    def get_dictionary(self):
-        return self.dictionary
+    def loads(self, data: bytes):
+        return marshal.loads(data[len(MarshalDataSerializer.MAGIC):])
 
-    def ensure_path_exists_and_get_dictionary(self, sub_keys: list[str]):
-        curr_dict = self.dictionary
 
-        for i in range(0, len(sub_keys)):
-            sub_key = sub_keys[i]
-            sub_dict = curr_dict.get(sub_key)
+DATA_SERIALIZERS = {
+    "json": JsonDataSerializer("json", indent = 4),
+    "json_compact": JsonDataSerializer("json_compact"),
+    "marshal": MarshalDataSerializer("marshal"),
+}
 
-            if sub_dict is None:
-                curr_dict[sub_key] = { }
-            elif isinstance(sub_dict, dict) is False:
-                formatted_key = ".".join(sub_keys[:i + 1])
-                raise TypeError(f"Expected a dictionary, but found a non-dictionary at {formatted_key}")
 
-            curr_dict = curr_dict.get(sub_key)
+def get_data_serializer(name: str, compact: bool = False):
+    if name == "json" and compact is True:
+        name = "json_compact"
+    serializer = DATA_SERIALIZERS.get(name)
+    if serializer is None:
+        raise ValueError(f"Unknown data file format '{name}', expected one of {', '.join(DATA_SERIALIZERS.keys())}")
+    return serializer
 
-        return curr_dict
 
-    def get_sub_dict_and_leaf_node_key(self, key: str):
-        with self.data_structure_lock:
-            split_key = key.split('.')
-            dict_path = split_key[0:-1]
-            leaf_key = split_key[-1]
-            self.print_debug(f"dict_path: {dict_path}, leaf_key: {leaf_key}")
-            sub_dict = self.ensure_path_exists_and_get_dictionary(dict_path)
-            return sub_dict, leaf_key
+# Files are read in whatever format they were written in
+def detect_data_serializer(data: bytes):
+    if data.startswith(MarshalDataSerializer.MAGIC):
+        return DATA_SERIALIZERS["marshal"]
+    return DATA_SERIALIZERS["json"]
 
-    def dictionary_get(self, key: str):
-        # Type Hint
-        if isinstance(self.dictionary, dict) is False:
-            raise TypeError("Expected a dictionary")
 
-        with self.get_and_set_lock:
-            sub_dict, leaf_key = self.get_sub_dict_and_leaf_node_key(key)
-            value = sub_dict.get(leaf_key)
+def read_data_file(file_name: str):
+    with open(file_name, 'rb') as file:
+        data = file.read()
+    return detect_data_serializer(data).loads(data)
 
-        self.print_debug(f"dictionary_get: '{key}': '{value}'")
-        return value
 
-    def dictionary_set(self, key: str, value):
-        # Type Hint
-        if isinstance(self.dictionary, dict) is False:
-            raise TypeError("Expected a dictionary")
+def load_json_data(file_name: str) -> dict:
+    debug("json_data", f"Loading {file_name}...")
+    if os.path.exists(file_name):
+        return read_data_file(file_name)
+    return {}
 
-        with self.get_and_set_lock:
-            sub_dict, leaf_key = self.get_sub_dict_and_leaf_node_key(key)
-            if isinstance(sub_dict.get(leaf_key), dict) is True:
-                raise TypeError(f"Expected a non-dictionary, but found a dictionary at {key}")
-            else:
-                sub_dict[leaf_key] = value
-                self.print_debug(f"dictionary_set: '{key}' to '{value}'")
 
+#
+# Writes to a temporary file next to `file_name` and moves it into place,
+# so a crash part way through never leaves a truncated file behind.
+#
+def write_file_atomic(file_name: str, data: bytes) -> None:
+    temp_file_name = f"{file_name}.tmp"
+    with open(temp_file_name, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_file_name, file_name)
 
-main_bot_data_json = load_json_data(MAIN_DATA_FILE)
-main_bot_data = JsonDictionary(name = "main_data", dictionary = main_bot_data_json)
 
+def write_data_file_atomic(data, file_name: str, serializer) -> None:
+    write_file_atomic(file_name, serializer.dumps(data))
 
-class CustomBot(commands.Bot):
-    async def close(self):
-        log("Cleaning up...")
 
-        for key in debug_channel_dict.keys():
-            main_dict_key = get_debug_channel_value_path(key)
-            main_bot_data.dictionary_set(main_dict_key, debug_channel_dict[key])
+def write_json_data_atomic(data, file_name: str, indent: int = 4) -> None:
+    write_data_file_atomic(data, file_name, JsonDataSerializer("json", indent = indent))
 
-        log("Saving data...")
-        await backup_and_save_json_data(main_bot_data.get_dictionary(), MAIN_DATA_FILE)
 
-        log("Shutting down...")
-        await super().close()
+# Shard files are never meant to be read by people, so they're never indented
+def get_shard_serializer(serializer):
+    if serializer.name == "json":
+        return DATA_SERIALIZERS["json_compact"]
+    return serializer
 
 
-bot = CustomBot(command_prefix = COMMAND_PREFIX, intents = intents)
+# Serializer used for the main data file
+main_data_serializer = get_data_serializer(DATA_FILE_FORMAT, compact = DATA_FILE_COMPACT)
 
 
 #
-# UTIL
+# Content-addressed backups of a set of data files.
 #
+# Every file is stored once per distinct content, compressed, as
+# `objects/<sha256>`. A backup is an entry in `index.json` that maps each
+# backed up file to the hash of its content at that time, so files that
+# didn't change between backups (such as idle server shards) take no extra
+# space, and a backup identical to the latest one is skipped entirely.
+#
+# After each backup, old backups are thinned out: the last `keep_latest`
+# backups are kept, as well as the newest backup of each of the last
+# `keep_hourly` hours, `keep_daily` days and `keep_weekly` weeks.
+# Objects no remaining backup refers to are deleted.
+#
+class BackupStore(object):
+    COMPRESSORS = {
+        "lzma": (".xz", lzma.compress, lzma.decompress),
+        "zlib": (".zz", lambda data: zlib.compress(data, 9), zlib.decompress),
+    }
+
+    def __init__(self, dir_name: str, compression: str = "lzma", keep_latest: int = 5,
+                 keep_hourly: int = 24, keep_daily: int = 7, keep_weekly: int = 8):
+        if compression not in BackupStore.COMPRESSORS:
+            raise ValueError(f"Unknown backup compression '{compression}'")
+
+        self.dir_name = dir_name
+        self.objects_dir_name = os.path.join(dir_name, "objects")
+        self.index_file_name = os.path.join(dir_name, "index.json")
+        self.compression = compression
+        self.keep_latest = keep_latest
+        self.keep_hourly = keep_hourly
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+
+        self.lock = threading.Lock()
+        # path -> (mtime_ns, size, sha256), so unchanged files aren't read again
+        self.hash_cache = {}
+
+    def load_index(self) -> list:
+        if os.path.exists(self.index_file_name) is False:
+            return []
+        with open(self.index_file_name, 'r') as file:
+            return json.load(file)["backups"]
+
+    def save_index(self, backups: list) -> None:
+        write_json_data_atomic({"backups": backups}, self.index_file_name, indent = None)
+
+    def hash_file(self, path: str) -> str:
+        stat = os.stat(path)
+        cached = self.hash_cache.get(path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1048576), b''):
+                digest.update(block)
+        file_hash = digest.hexdigest()
+        self.hash_cache[path] = (stat.st_mtime_ns, stat.st_size, file_hash)
+        return file_hash
+
+    def find_object(self, file_hash: str):
+        for suffix, compress, decompress in BackupStore.COMPRESSORS.values():
+            object_file_name = os.path.join(self.objects_dir_name, f"{file_hash}{suffix}")
+            if os.path.exists(object_file_name):
+                return object_file_name, decompress
+        return None, None
+
+    def store_object(self, path: str, file_hash: str) -> None:
+        object_file_name, decompress = self.find_object(file_hash)
+        if object_file_name is not None:
+            return
 
+        suffix, compress, decompress = BackupStore.COMPRESSORS[self.compression]
+        with open(path, 'rb') as file:
+            data = compress(file.read())
+        object_file_name = os.path.join(self.objects_dir_name, f"{file_hash}{suffix}")
+        with open(f"{object_file_name}.tmp", 'wb') as file:
+            file.write(data)
+        os.replace(f"{object_file_name}.tmp", object_file_name)
+
+    #
+    # Backs up `files` (stored name -> path on disk).
+    # Returns the new backup entry, or `None` if nothing changed since the last backup.
+    #
+    def create(self, files: dict):
+        with self.lock:
+            mkdir_ignore_exists(self.dir_name)
+            mkdir_ignore_exists(self.objects_dir_name)
+
+            hashes = {}
+            for name, path in files.items():
+                hashes[name] = self.hash_file(path)
+
+            backups = self.load_index()
+            if len(backups) > 0 and backups[-1]["files"] == hashes:
+                debug("backup", "Data hasn't changed since the last backup, skipping")
+                return None
+
+            for name, path in files.items():
+                self.store_object(path, hashes[name])
+
+            now = datetime.datetime.now()
+            backup_id = format_datetime_all_dashes(now)
+            suffix = 1
+            while any(backup["id"] == backup_id for backup in backups):
+                backup_id = f"{format_datetime_all_dashes(now)}-{suffix}"
+                suffix += 1
+
+            entry = {"id": backup_id, "time": now.timestamp(), "files": hashes}
+            backups.append(entry)
+            backups = self.apply_retention(backups)
+            self.save_index(backups)
+            self.remove_unused_objects(backups)
+
+            debug("backup", f"Created backup {backup_id} of {len(files)} files")
+            return entry
+
+    def apply_retention(self, backups: list) -> list:
+        keep_ids = {backup["id"] for backup in backups[-max(1, self.keep_latest):]}
+        bucket_formats = [
+            ("%Y-%m-%d %H", self.keep_hourly),
+            ("%Y-%m-%d", self.keep_daily),
+            ("%G-%V", self.keep_weekly),
+        ]
+        for bucket_format, keep_count in bucket_formats:
+            seen_buckets = set()
+            for backup in reversed(backups):
+                bucket = datetime.datetime.fromtimestamp(backup["time"]).strftime(bucket_format)
+                if bucket in seen_buckets:
+                    continue
+                if len(seen_buckets) >= keep_count:
+                    break
+                seen_buckets.add(bucket)
+                keep_ids.add(backup["id"])
+
+        return [backup for backup in backups if backup["id"] in keep_ids]
+
+    def remove_unused_objects(self, backups: list) -> None:
+        used_hashes = set()
+        for backup in backups:
+            used_hashes.update(backup["files"].values())
+
+        for object_file_name in os.listdir(self.objects_dir_name):
+            file_hash = object_file_name.split('.')[0]
+            if file_hash not in used_hashes:
+                os.remove(os.path.join(self.objects_dir_name, object_file_name))
+
+    def list(self) -> list:
+        with self.lock:
+            return self.load_index()
+
+    def get(self, backup_id: str):
+        for backup in self.list():
+            if backup["id"] == backup_id:
+                return backup
+        return None
 
-def get_server_data_path_prefix(server_id: int):
-    return f"servers.{server_id}"
+    def get_size(self, backup: dict) -> int:
+        size = 0
+        for file_hash in set(backup["files"].values()):
+            object_file_name, decompress = self.find_object(file_hash)
+            if object_file_name is not None:
+                size += os.path.getsize(object_file_name)
+        return size
 
+    def verify(self, backup: dict) -> None:
+        for name, file_hash in backup["files"].items():
+            object_file_name, decompress = self.find_object(file_hash)
+            if object_file_name is None:
+                raise FileNotFoundError(f"Backup {backup['id']} is missing the data for {name}")
 
-def get_server_user_data_path_prefix(server_id: int, user_id: int):
-    return f"{get_server_data_path_prefix(server_id)}.users.{user_id}"
+    def extract(self, backup: dict, name: str, path: str) -> None:
+        object_file_name, decompress = self.find_object(backup["files"][name])
+        if object_file_name is None:
+            raise FileNotFoundError(f"Backup {backup['id']} is missing the data for {name}")
 
+        with open(object_file_name, 'rb') as file:
+            data = decompress(file.read())
 
-def get_server_user_permissions_data_path_prefix(server_id: int, user_id: int):
-    return f"{get_server_user_data_path_prefix(server_id, user_id)}.permissions"
+        parent_dir = os.path.dirname(path)
+        if parent_dir != "":
+            os.makedirs(parent_dir, exist_ok = True)
+        write_file_atomic(path, data)
 
 
-def get_server_user_permission_data_path(server_id: int, user_id: int, permission: str):
-    return f"{get_server_user_permissions_data_path_prefix(server_id, user_id)}.{permission}"
+backup_store = BackupStore(DATA_BACKUP_DIR, compression = DATA_BACKUP_COMPRESSION, keep_latest = DATA_BACKUP_KEEP_LATEST,
+                           keep_hourly = DATA_BACKUP_KEEP_HOURLY, keep_daily = DATA_BACKUP_KEEP_DAILY,
+                           keep_weekly = DATA_BACKUP_KEEP_WEEKLY)
 
 
-def get_server_user_permission_value(server_id: int, user_id: int, permission: str):
-    if re.fullmatch(PERMISSION_VALID_NAME_PATTERN, permission) is None:
-        raise ValueError(f"Permission does not match regex {PERMISSION_VALID_NAME_PATTERN}")
-    return main_bot_data.dictionary_get(get_server_user_permission_data_path(server_id, user_id, permission))
+#
+# An append-only log of changes made to a `JsonDictionary`, so changes
+# survive a crash without rewriting the whole data file every time.
+#
+# Every change is one line of compact JSON, for example
+# `["s", "servers.1.users.2.permissions.is_admin", true]`.
+# `append()` only queues the line. A background thread writes whatever
+# has queued up and fsyncs once per batch ("group commit"), at most
+# every `commit_interval` seconds.
+#
+# On startup the journal is replayed on top of the last saved snapshot.
+# Once the journal grows past `compact_bytes`, `on_compact` is called from
+# the writer thread to save a new snapshot. While the snapshot is taken,
+# `mark_rotation()` queues a marker after the changes it contains; when
+# the marker is committed, the journal so far is moved to `<file>.old`,
+# which is removed once the snapshot is safely on disk. Replaying a change twice gives the
+# same result, so a crash at any point during compaction is harmless.
+#
+class DataJournal(object):
+    ROTATE = object()
+
+    def __init__(self, file_name: str, commit_interval: float = 0.1, compact_bytes: int = 8388608):
+        self.file_name = file_name
+        self.old_file_name = f"{file_name}.old"
+        self.commit_interval = commit_interval
+        self.compact_bytes = compact_bytes
+        self.on_compact = None
+
+        self.lock = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.pending = []
+        self.file = None
+        self.thread = None
+        self.stopping = False
+
+        self.records_written = 0
+        self.commits = 0
+        self.compactions = 0
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return
+        self.file = open(self.file_name, 'a')
+        self.stopping = False
+        self.thread = threading.Thread(target = self.run, name = "data-journal", daemon = True)
+        self.thread.start()
 
+    def stop(self) -> None:
+        if self.thread is None:
+            return
+        with self.lock:
+            self.stopping = True
+            self.lock.notify()
+        self.thread.join()
+        self.thread = None
+        self.file.close()
+        self.file = None
+
+    def append(self, record: list) -> None:
+        line = json.dumps(record, separators = (',', ':'))
+        with self.lock:
+            self.pending.append(line)
+            self.lock.notify()
+
+    def append_set(self, key: str, value) -> None:
+        self.append(["s", key, value])
+
+    def append_delete(self, key: str) -> None:
+        self.append(["d", key])
+
+    def append_batch(self, records: list) -> None:
+        self.append(["t", records])
+
+    # Must hold `write_lock`
+    def commit_pending(self) -> None:
+        with self.lock:
+            lines = self.pending
+            self.pending = []
+
+        batch = []
+        for line in lines:
+            if line is DataJournal.ROTATE:
+                self.write_lines(batch)
+                batch = []
+                self.rotate_file()
+            else:
+                batch.append(line)
+        self.write_lines(batch)
 
-def get_quiz_data_path_prefix(server_id: int, quiz_name: str):
-    return f"{get_server_data_path_prefix(server_id)}.quizzes.{quiz_name}"
+    # Must hold `write_lock`
+    def write_lines(self, lines: list) -> None:
+        if len(lines) < 1:
+            return
 
+        # Stopped journals still take the changes made while shutting down
+        file = self.file if self.file is not None else open(self.file_name, 'a')
+        try:
+            file.write("\n".join(lines) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        finally:
+            if file is not self.file:
+                file.close()
+        self.records_written += len(lines)
+        self.commits += 1
+
+    def run(self) -> None:
+        while True:
+            with self.lock:
+                while len(self.pending) < 1 and self.stopping is False:
+                    self.lock.wait()
+                stopping = self.stopping
+
+            with self.write_lock:
+                self.commit_pending()
+                size = self.file.tell()
+
+            if stopping is True:
+                return
 
-def is_valid_quiz_name(name: str):
-    if re.fullmatch(QUIZ_VALID_NAME_PATTERN, name) is not None:
-        return True
-    return False
+            if self.on_compact is not None and size >= self.compact_bytes:
+                try:
+                    self.on_compact()
+                    self.compactions += 1
+                except Exception as error:
+                    log(f"Failed to compact {self.file_name}: {error}")
+
+            # Let more changes queue up so they share the next fsync
+            time.sleep(self.commit_interval)
+
+    #
+    # Marks the point where the snapshot being taken ends. Only queues the
+    # marker, so it's cheap enough to call with the dictionary's lock held.
+    # The changes before it are moved to `<file>.old` by the next commit.
+    #
+    def mark_rotation(self) -> None:
+        with self.lock:
+            self.pending.append(DataJournal.ROTATE)
+            self.lock.notify()
+
+    # Writes and fsyncs everything queued so far, including any rotation
+    def commit(self) -> None:
+        with self.write_lock:
+            self.commit_pending()
+
+    # Moves everything journaled so far to `<file>.old` and starts a new, empty journal
+    def rotate(self) -> None:
+        self.mark_rotation()
+        self.commit()
+
+    # Must hold `write_lock`
+    def rotate_file(self) -> None:
+        if self.file is not None:
+            self.file.close()
+        if os.path.exists(self.file_name) is False:
+            pass
+        elif os.path.exists(self.old_file_name):
+            # An older rotation was never compacted, keep its changes in order
+            with open(self.old_file_name, 'a') as old_file, open(self.file_name, 'r') as file:
+                shutil.copyfileobj(file, old_file)
+            os.remove(self.file_name)
+        else:
+            os.replace(self.file_name, self.old_file_name)
+        if self.file is not None:
+            self.file = open(self.file_name, 'a')
+
+    def remove_rotated(self) -> None:
+        if os.path.exists(self.old_file_name):
+            os.remove(self.old_file_name)
+
+    def replay(self, dictionary) -> int:
+        count = 0
+        for file_name in [self.old_file_name, self.file_name]:
+            if os.path.exists(file_name) is False:
+                continue
+            with open(file_name, 'r') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut off by a crash, nothing after it was committed
+                        log(f"Skipping unreadable journal record in {file_name}")
+                        continue
+                    dictionary.apply_journal_record(record)
+                    count += 1
+        return count
+
+    def get_stats(self) -> dict:
+        size = 0
+        if os.path.exists(self.file_name):
+            size = os.path.getsize(self.file_name)
+        return {
+            "size": size,
+            "records_written": self.records_written,
+            "commits": self.commits,
+            "compactions": self.compactions,
+        }
 
 
-def get_user_data_path_prefix(user_id: int):
-    return f"users.{user_id}"
+#
+# Keeps the children of some top level keys of a `JsonDictionary`
+# (for example every `servers.<id>`) in their own files, and only keeps
+# the ones in use in memory.
+#
+# A shard is loaded into the tree the first time a key inside it is
+# used. When more than `max_loaded` shards are in memory, the least
+# recently used one is removed from the tree. If it changed, it's kept
+# in `evicted` until the next checkpoint writes it, so evicting never
+# writes files from inside a read or write of the dictionary. Using an
+# evicted shard again moves it straight back into the tree. Once
+# `max_loaded` changed shards are waiting, `on_full` is called so a
+# checkpoint can be started early, which keeps memory bounded even when
+# writes are spread over many shards.
+# Shards are tracked with the version of their last change, so saving
+# a copy never marks a shard clean if it changed again since.
+#
+# All methods must be called with the dictionary's lock held.
+#
+class DataShardStore(object):
+    def __init__(self, dir_name: str, roots: tuple, max_loaded: int = 256, serializer = None):
+        if serializer is None:
+            serializer = DATA_SERIALIZERS["json_compact"]
+
+        self.dir_name = dir_name
+        self.serializer = serializer
+        self.roots = frozenset(roots)
+        self.max_loaded = max(1, max_loaded)
+
+        # (root, shard id) -> version of the last unsaved change, 0 when saved
+        self.loaded = OrderedDict()
+        # (root, shard id) -> (version, data) of changed shards waiting to be written
+        self.evicted = {}
+        self.version = 0
+        # Called with the dictionary's lock held, must not save by itself
+        self.on_full = None
+
+        self.loads = 0
+        self.evictions = 0
+
+    def is_sharded_root(self, root: str) -> bool:
+        return root in self.roots
+
+    def get_shard_file_name(self, root: str, shard_id: str) -> str:
+        return os.path.join(self.dir_name, root, f"{shard_id}.json")
+
+    def mark_dirty(self, shard: tuple) -> None:
+        self.version += 1
+        self.loaded[shard] = self.version
+
+    # Returns whether sub-trees were loaded into or removed from `tree`
+    def touch(self, tree: dict, root: str, shard_id: str, dirty: bool) -> bool:
+        shard = (root, shard_id)
+        changed = False
+        if shard in self.loaded:
+            self.loaded.move_to_end(shard)
+        else:
+            self.loaded[shard] = 0
+            self.load(tree, shard)
+            changed = True
+
+        if dirty is True:
+            self.mark_dirty(shard)
+
+        while len(self.loaded) > self.max_loaded:
+            oldest = next(iter(self.loaded))
+            if oldest == shard:
+                break
+            self.evict(tree, oldest)
+            changed = True
+        return changed
+
+    def load(self, tree: dict, shard: tuple) -> None:
+        root, shard_id = shard
+        pending = self.evicted.pop(shard, None)
+        if pending is not None:
+            version, data = pending
+            if data is not None:
+                tree.setdefault(root, {})[shard_id] = data
+            self.loaded[shard] = version
+            return
 
+        file_name = self.get_shard_file_name(root, shard_id)
+        if os.path.exists(file_name) is False:
+            return
 
-def roll_die(sides: int):
-    return random.choice(range(1, sides + 1))
+        data = read_data_file(file_name)
+        tree.setdefault(root, {})[shard_id] = data
+        self.loads += 1
+        debug_lazy("shards", "Loaded shard {}.{}", root, shard_id)
+
+    def evict(self, tree: dict, shard: tuple) -> None:
+        root, shard_id = shard
+        version = self.loaded.pop(shard)
+        data = tree.get(root, {}).pop(shard_id, None)
+        if version != 0:
+            self.evicted[shard] = (version, data)
+            if len(self.evicted) >= self.max_loaded and self.on_full is not None:
+                self.on_full()
+        self.evictions += 1
+        debug_lazy("shards", "Evicted shard {}.{}", root, shard_id)
+
+    def write_shard(self, root: str, shard_id: str, data) -> None:
+        file_name = self.get_shard_file_name(root, shard_id)
+        if data is None or len(data) < 1:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+            return
 
+        mkdir_ignore_exists(self.dir_name)
+        mkdir_ignore_exists(os.path.join(self.dir_name, root))
+        write_data_file_atomic(data, file_name, self.serializer)
+
+    #
+    # Treats every shard already in the tree as loaded and unsaved,
+    # which moves data from before sharding was enabled into shard files.
+    #
+    def adopt_loaded_shards(self, tree: dict) -> None:
+        for root in self.roots:
+            sub_tree = tree.get(root)
+            if isinstance(sub_tree, dict) is False:
+                continue
+            for shard_id in list(sub_tree.keys()):
+                self.touch(tree, root, shard_id, True)
+
+    # Returns [(root, shard id, version, copy of data)] for every unsaved shard, evicted or not
+    def copy_dirty_shards(self, tree: dict) -> list:
+        dirty = []
+        for (root, shard_id), version in self.loaded.items():
+            if version == 0:
+                continue
+            data = tree.get(root, {}).get(shard_id)
+            dirty.append((root, shard_id, version, marshal.loads(marshal.dumps(data))))
+        for (root, shard_id), (version, data) in self.evicted.items():
+            dirty.append((root, shard_id, version, marshal.loads(marshal.dumps(data))))
+        return dirty
+
+    def mark_saved(self, root: str, shard_id: str, version: int) -> None:
+        shard = (root, shard_id)
+        if self.loaded.get(shard) == version:
+            self.loaded[shard] = 0
+        pending = self.evicted.get(shard)
+        if pending is not None and pending[0] == version:
+            del self.evicted[shard]
+
+    # Whether the shard's data is in memory, so its file may be out of date
+    def is_in_memory(self, root: str, shard_id: str) -> bool:
+        return (root, shard_id) in self.loaded or (root, shard_id) in self.evicted
+
+    def get_stats(self) -> dict:
+        dirty = 0
+        for version in self.loaded.values():
+            if version != 0:
+                dirty += 1
+        return {
+            "loaded": len(self.loaded),
+            "dirty": dirty,
+            "evicted_unsaved": len(self.evicted),
+            "max_loaded": self.max_loaded,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
 
-def roll_dice(num_dice: int, sides: int):
-    total = 0
-    for x in range(1, num_dice + 1):
-        total += roll_die(sides)
-    return total
 
+#
+# A dotted key such as `servers.1.users.2.permissions.is_admin`, split up
+# once. Splitting the key is most of the cost of a lookup, so get these
+# from `compile_key_path()`, which keeps recently used ones around,
+# or from the `get_*_path()` helpers, instead of creating them directly.
+#
+class KeyPath(object):
+    __slots__ = ("key", "parts", "parent", "leaf", "child")
 
-def random_error_message():
-    return random.choice(ERROR_MESSAGES)
+    def __init__(self, key: str, parts: tuple = None):
+        if parts is None:
+            parts = tuple(key.split('.'))
+        self.key = key
+        self.parts = parts
+        self.parent = parts[:-1]
+        self.leaf = parts[-1]
+        # Second level sub-tree the key is in, see `JsonDictionary.freeze_main_tree()`
+        self.child = (parts[0], parts[1] if len(parts) > 1 else None)
 
+    # Path to a child of this path, without splitting anything again.
+    # Names aren't interned, since some come from users (such as quiz
+    # names) and interned strings are never freed. Fixed names written
+    # as literals, like "quizzes", are interned by Python already.
+    def join(self, *names: str) -> "KeyPath":
+        return KeyPath(".".join((self.key,) + names), self.parts + names)
 
-def mock_word(word: str) -> str:
-    if len(word) < 1:
-        return word
+    def __str__(self):
+        return self.key
 
-    if len(word) == 1:
-        return word.upper()
+    def __repr__(self):
+        return f"KeyPath('{self.key}')"
 
-    lettercount = 0
-    can_cap = []
-    for i in range(0, len(word)):
-        char = word[i]
-        if char.isalpha():
-            lettercount += 1
-            can_cap.append(i)
+    def __eq__(self, other):
+        return isinstance(other, KeyPath) and self.key == other.key
 
-    num_to_capitalize = int(float(lettercount) * (67/100))
-    word = word.lower()
+    def __hash__(self):
+        return hash(self.key)
 
-    which_to_capitalize = []
-    for j in range(num_to_capitalize):
-        i = random.choice(range(0, len(can_cap)))
-        which_to_capitalize.append(can_cap[i])
-        can_cap.remove(can_cap[i])
 
-    to_ret = ""
-    for i in range(0, len(word)):
-        char = word[i]
-        if i in which_to_capitalize:
-            char = char.upper()
-        to_ret += char
-    return to_ret
+@functools.lru_cache(maxsize = KEY_PATH_CACHE_SIZE)
+def compile_key_path(key: str) -> KeyPath:
+    return KeyPath(key)
 
 
-def mock_string(message: str) -> str:
-    words = message.split(" ")
-    new_words = []
-    for word in words:
-        new_words.append(mock_word(word))
-    return " ".join(new_words)
+# Dictionary methods take either a dotted key string or a `KeyPath`
+def as_key_path(key) -> KeyPath:
+    if isinstance(key, KeyPath):
+        return key
+    return compile_key_path(key)
 
 
 #
-# Performs a GET fetch and returns the JSON response
-# when the GET was successful. Otherwise, returns `None`
+# Changes that are applied together by `apply_batch()`, under one lock
+# and as one journal record: either all of them or, if one of them
+# fails, none of them. Usually made with `dictionary.batch()`, which
+# applies it when the `with` block ends without an exception.
 #
-def http_get_json_generic(url: str):
-    debug("http", f"JSON GET {url}")
-    request = requests.get(url)
-
-    if request.status_code != 200 and request.status_code != 201:
-        log(f"Request to '{url}' returned status code {request.status_code}")
-        return None
+class DataBatch(object):
+    def __init__(self, dictionary = None):
+        self.dictionary = dictionary
+        self.operations = []
 
-    try:
-        response_json = request.json()
-    except JSONDecodeError:
-        log(f"Request to '{url}' returned bad JSON")
-        return None
+    def set(self, key: str | KeyPath, value) -> None:
+        self.operations.append(("s", as_key_path(key), value))
 
-    return response_json
+    def delete(self, key: str | KeyPath) -> None:
+        self.operations.append(("d", as_key_path(key)))
 
+    def get_journal_records(self) -> list:
+        records = []
+        for operation in self.operations:
+            if operation[0] == "s":
+                records.append(["s", operation[1].key, operation[2]])
+            else:
+                records.append(["d", operation[1].key])
+        return records
 
-async def get_random_no():
-    response_json = http_get_json_generic("https://naas.isalman.dev/no")
-    if response_json is None:
-        return None
+    def __enter__(self):
+        return self
 
-    reason = response_json["reason"]
-    if reason is None:
-        raise ValueError("'reason' is not set")
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.dictionary is not None and len(self.operations) > 0:
+            self.dictionary.apply_batch(self)
 
-    return reason
 
+#
+# A reader/writer lock that can be waited on from threads (`with`) and
+# from coroutines (`async with`) without blocking the event loop.
+# Waiters are let in first come, first served, so a stream of readers
+# can't keep a writer out. Not reentrant.
+#
+class ReadWriteLock(object):
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.readers = 0
+        self.writer = False
+        # [wants to write, function that wakes it, was granted]
+        self.waiters = deque()
+        self.contended = 0
+
+    # Must hold `mutex`
+    def can_acquire(self, write: bool) -> bool:
+        if len(self.waiters) > 0 or self.writer is True:
+            return False
+        return write is False or self.readers == 0
+
+    # Must hold `mutex`
+    def take(self, write: bool) -> None:
+        if write is True:
+            self.writer = True
+        else:
+            self.readers += 1
 
-def status_str_to_discord_status(status: str):
-    if status == "online":
-        discord_status = discord.Status.online
-    elif status == "idle":
-        discord_status = discord.Status.idle
-    elif status == "dnd":
-        discord_status = discord.Status.do_not_disturb
-    elif status == "invisible":
-        discord_status = discord.Status.invisible
-    else:
-        discord_status = None
-    return discord_status
+    # Must hold `mutex`. The lock is handed over before waking the waiter.
+    def grant_waiters(self) -> None:
+        while len(self.waiters) > 0:
+            waiter = self.waiters[0]
+            if self.writer is True or (waiter[0] is True and self.readers > 0):
+                return
+            self.waiters.popleft()
+            self.take(waiter[0])
+            waiter[2] = True
+            waiter[1]()
+
+    def acquire(self, write: bool) -> None:
+        with self.mutex:
+            if self.can_acquire(write):
+                self.take(write)
+                return
+            event = threading.Event()
+            self.waiters.append([write, event.set, False])
+            self.contended += 1
+        event.wait()
+
+    async def acquire_async(self, write: bool) -> None:
+        with self.mutex:
+            if self.can_acquire(write):
+                self.take(write)
+                return
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            waiter = [write, lambda: loop.call_soon_threadsafe(ReadWriteLock.resolve, future), False]
+            self.waiters.append(waiter)
+            self.contended += 1
 
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self.mutex:
+                granted = waiter[2]
+                if granted is False:
+                    self.waiters.remove(waiter)
+                    self.grant_waiters()
+            if granted is True:
+                self.release(write)
+            raise
+
+    @staticmethod
+    def resolve(future) -> None:
+        if future.done() is False:
+            future.set_result(None)
+
+    def release(self, write: bool) -> None:
+        with self.mutex:
+            if write is True:
+                self.writer = False
+            else:
+                self.readers -= 1
+            self.grant_waiters()
 
-async def update_presence(status: discord.Status | None, message: str | None):
-    if status is None:
-        status = discord.Status.online
+    def reading(self):
+        return ReadWriteLockHolder(self, False)
 
-    if message is None:
-        await bot.change_presence(status = status)
-    else:
-        game = discord.Game(message)
-        await bot.change_presence(status = status, activity = game)
+    def writing(self):
+        return ReadWriteLockHolder(self, True)
 
 
-def is_admin_user(user):
-    users = ADMIN_USERNAMES.split(",")
-    for name in users:
-        if user.name == name:
-            return True
-    return False
+class ReadWriteLockHolder(object):
+    def __init__(self, lock: ReadWriteLock, write: bool):
+        self.lock = lock
+        self.write = write
 
+    def __enter__(self):
+        self.lock.acquire(self.write)
+        return self
 
-def user_is_bot_admin_in_server(user_id: int, server_id: int):
-    user_is_admin = get_server_user_permission_value(server_id, user_id, "is_admin")
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.lock.release(self.write)
 
-    result = False
-    if user_is_admin is True:
-        result = True
-    debug("permission", f"User {user_id} is a bot admin in server {server_id}: {result}")
-    return result
+    async def __aenter__(self):
+        await self.lock.acquire_async(self.write)
+        return self
 
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.lock.release(self.write)
 
-def user_has_permission_in_server(user_id: int, server_id: int, permission: str):
-    debug("permission", f"Checking if user {user_id} has permission '{permission}' in server {server_id}")
 
-    # If the user is an admin in the server, they automatically have permission to do *anything*
-    if user_is_bot_admin_in_server(user_id, server_id) is True:
-        return True
+#
+# One reader/writer lock per second level sub-tree, such as one server
+# (`servers.<id>`) or one game channel (`hangman.<id>`). They make a
+# read-modify-write of a sub-tree, which may wait on Discord in between,
+# safe from other commands changing the same sub-tree, while commands for
+# other servers and channels carry on. Each change is still applied under
+# the dictionary's own lock. Locks nobody holds are dropped.
+#
+class SubtreeLocks(object):
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.locks = weakref.WeakValueDictionary()
 
-    permission_value = get_server_user_permission_value(server_id, user_id, permission)
-    result = False
-    if permission_value is True:
-        result = True
-    debug("permission", f"User {user_id} has permission '{permission}' in server {server_id}: {result}")
-    return result
+    def get_lock(self, key: str | KeyPath) -> ReadWriteLock:
+        child = as_key_path(key).child
+        with self.mutex:
+            lock = self.locks.get(child)
+            if lock is None:
+                lock = ReadWriteLock()
+                self.locks[child] = lock
+            return lock
 
+    def reading(self, key: str | KeyPath) -> ReadWriteLockHolder:
+        return self.get_lock(key).reading()
 
-async def send_dm_to_user(user: discord.User, message: str = None, embed: discord.Embed = None, silent: bool = False):
-    details_list = []
+    def writing(self, key: str | KeyPath) -> ReadWriteLockHolder:
+        return self.get_lock(key).writing()
 
-    if message is not None:
-        details_list.append(f"Message: `{message}`")
 
-    if embed is not None:
-        details_list.append("Has Embed")
+register_debug_channel("dictionary")
+register_debug_channel("shards")
 
-    if silent is True:
-        details_list.append("Is Silent")
-    else:
-        details_list.append("Is Not Silent")
 
-    details = ", ".join(details_list)
+class JsonDictionary(object):
+    # Stands in for keys that didn't exist in undo records
+    MISSING = object()
 
-    debug("DM", f"Sending DM to {user.name}. {details}")
-    await user.create_dm()
-    await user.send(message, embed = embed, silent = silent)
+    def __init__(self, name: str = "unnamed", dictionary = None):
+        if dictionary is None:
+            dictionary = dict()
 
+        # Guards the whole tree, the shard store and the caches below. Each
+        # read or write holds it only for a few dictionary operations and
+        # never for file I/O, so one lock is cheaper than a lock per
+        # sub-tree would be. `subtree_locks` are for callers that need a
+        # whole read-modify-write sequence to themselves.
+        self.get_and_set_lock = threading.Lock()
 
-async def send_dm_to_user_by_id(user_id: int, message: str = None, embed: discord.Embed = None, silent: bool = False):
-    user = await bot.fetch_user(user_id)
-    await send_dm_to_user(user, message, embed = embed, silent = silent)
+        self.name = name
+        self.dictionary = dictionary
+        self.journal = None
+        self.shards = None
+        self.subtree_locks = SubtreeLocks()
+        self.change_listeners = []
+
+        self.checkpoint_lock = threading.Lock()
+        # Frozen copies of second level sub-trees from the last snapshot,
+        # and which ones changed since then
+        self.frozen_children = {}
+        self.changed_children = set()
+        # Parent path (tuple of keys) -> the dictionary at that path. Only
+        # holds dictionaries, which stay in place until the tree is
+        # replaced or a shard is loaded or evicted, which clear it.
+        self.parent_cache = {}
+
+    def attach_journal(self, journal: DataJournal) -> None:
+        self.journal = journal
+
+    #
+    # `listener(key_path)` is called after every change, with the dictionary's
+    # lock held, so it must be quick and must not use the dictionary.
+    # `key_path` is `None` when anything may have changed.
+    #
+    def add_change_listener(self, listener) -> None:
+        self.change_listeners.append(listener)
+
+    def notify_changed(self, key_path: KeyPath | None) -> None:
+        for listener in self.change_listeners:
+            listener(key_path)
+
+    def attach_shard_store(self, shards: DataShardStore) -> None:
+        with self.get_and_set_lock:
+            self.shards = shards
+            shards.adopt_loaded_shards(self.dictionary)
+
+    def get_string_prefix(self):
+        return f"<JsonDictionary {self.name}>"
+
+    def __str__(self):
+        return self.get_string_prefix()
+
+    # `message` is a format string for `args`, see `debug_lazy()`
+    def print_debug(self, message: str, *args):
+        debug_lazy("dictionary", "{} " + message, self, *args)
+
+    def get_dictionary(self):
+        return self.dictionary
+
+    def ensure_path_exists_and_get_dictionary(self, sub_keys: tuple, undo: list = None):
+        curr_dict = self.dictionary
+
+        for i in range(0, len(sub_keys)):
+            sub_key = sub_keys[i]
+            sub_dict = curr_dict.get(sub_key)
+
+            if sub_dict is None:
+                curr_dict[sub_key] = { }
+                if undo is not None:
+                    undo.append((curr_dict, sub_key, JsonDictionary.MISSING))
+            elif isinstance(sub_dict, dict) is False:
+                formatted_key = ".".join(sub_keys[:i + 1])
+                raise TypeError(f"Expected a dictionary, but found a non-dictionary at {formatted_key}")
+
+            curr_dict = curr_dict.get(sub_key)
+
+        return curr_dict
+
+    # Returns the dictionary at `sub_keys`, or `None` if there isn't one yet. Never changes the tree.
+    def find_dictionary(self, sub_keys: tuple):
+        curr_dict = self.dictionary
+
+        for i in range(0, len(sub_keys)):
+            curr_dict = curr_dict.get(sub_keys[i])
+
+            if curr_dict is None:
+                return None
+            elif isinstance(curr_dict, dict) is False:
+                formatted_key = ".".join(sub_keys[:i + 1])
+                raise TypeError(f"Expected a dictionary, but found a non-dictionary at {formatted_key}")
+
+        return curr_dict
+
+    #
+    # Makes sure the shard `key_path` is in is loaded and,
+    # when writing, marks it and its sub-tree as changed.
+    #
+    # Must hold `get_and_set_lock`
+    #
+    def touch_key_path(self, key_path: KeyPath, for_write: bool) -> None:
+        parts = key_path.parts
+        if self.shards is not None and len(parts) > 1 and self.shards.is_sharded_root(parts[0]):
+            if self.shards.touch(self.dictionary, parts[0], parts[1], for_write) is True:
+                self.parent_cache.clear()
+        if for_write is True:
+            self.changed_children.add(key_path.child)
+
+    #
+    # The parent dictionary is only created when writing, so reading a key
+    # that doesn't exist doesn't leave empty dictionaries behind. In that
+    # case the returned dictionary is `None`.
+    #
+    # Must hold `get_and_set_lock`
+    #
+    def get_sub_dict_and_leaf_node_key(self, key_path: KeyPath, for_write: bool = False, undo: list = None):
+        self.touch_key_path(key_path, for_write)
+
+        sub_dict = self.parent_cache.get(key_path.parent)
+        if sub_dict is None:
+            self.print_debug("dict_path: {}, leaf_key: {}", key_path.parent, key_path.leaf)
+            if for_write is True:
+                sub_dict = self.ensure_path_exists_and_get_dictionary(key_path.parent, undo)
+            else:
+                sub_dict = self.find_dictionary(key_path.parent)
+                if sub_dict is None:
+                    return None, key_path.leaf
+
+            if len(self.parent_cache) >= KEY_PATH_CACHE_SIZE:
+                self.parent_cache.clear()
+            self.parent_cache[key_path.parent] = sub_dict
+        return sub_dict, key_path.leaf
+
+    #
+    # Dicts and lists are returned as they are in the tree, without copying,
+    # and must not be changed. `freeze_main_tree()` only re-freezes children
+    # written through `dictionary_set()`, so a change made in place would
+    # never reach the data file. Use `dictionary_get_copy()` to change one.
+    #
+    def dictionary_get(self, key: str | KeyPath):
+        # Type Hint
+        if isinstance(self.dictionary, dict) is False:
+            raise TypeError("Expected a dictionary")
+
+        with self.get_and_set_lock:
+            value = self.get_value_locked(as_key_path(key))
+
+        self.print_debug("dictionary_get: '{}': '{}'", key, value)
+        return value
+
+    #
+    # Like `dictionary_get()`, but returns a copy that's safe to keep,
+    # iterate and change while other threads change the tree. Changes
+    # are saved by writing the copy back with `dictionary_set()`.
+    #
+    def dictionary_get_copy(self, key: str | KeyPath):
+        with self.get_and_set_lock:
+            value = self.get_value_locked(as_key_path(key))
+            if isinstance(value, (dict, list)):
+                value = marshal.loads(marshal.dumps(value))
+        return value
+
+    # Reads several keys under one lock, so they're consistent with each other
+    def dictionary_get_many(self, keys: list) -> list:
+        with self.get_and_set_lock:
+            values = [self.get_value_locked(as_key_path(key)) for key in keys]
+
+        self.print_debug("dictionary_get_many: '{}': '{}'", keys, values)
+        return values
+
+    # Must hold `get_and_set_lock`
+    def get_value_locked(self, key_path: KeyPath):
+        sub_dict, leaf_key = self.get_sub_dict_and_leaf_node_key(key_path)
+        if sub_dict is None:
+            return None
+        return sub_dict.get(leaf_key)
+
+    def dictionary_set(self, key: str | KeyPath, value):
+        # Type Hint
+        if isinstance(self.dictionary, dict) is False:
+            raise TypeError("Expected a dictionary")
+
+        key_path = as_key_path(key)
+        with self.get_and_set_lock:
+            self.set_value_locked(key_path, value)
+            if self.journal is not None:
+                self.journal.append_set(key_path.key, value)
+            self.notify_changed(key_path)
+        self.print_debug("dictionary_set: '{}' to '{}'", key, value)
+
+    #
+    # When `undo` is given, records what's needed to take the change back.
+    #
+    # Must hold `get_and_set_lock`
+    #
+    def set_value_locked(self, key_path: KeyPath, value, undo: list = None) -> None:
+        sub_dict, leaf_key = self.get_sub_dict_and_leaf_node_key(key_path, for_write = True, undo = undo)
+        old_value = sub_dict.get(leaf_key, JsonDictionary.MISSING)
+        if isinstance(old_value, dict) is True:
+            raise TypeError(f"Expected a non-dictionary, but found a dictionary at {key_path}")
+
+        sub_dict[leaf_key] = value
+        if undo is not None:
+            undo.append((sub_dict, leaf_key, old_value))
+
+    #
+    # Removes the value or sub-tree at `key`, along with every parent
+    # dictionary that's left empty. Returns whether anything was removed.
+    #
+    def dictionary_delete(self, key: str | KeyPath) -> bool:
+        # Type Hint
+        if isinstance(self.dictionary, dict) is False:
+            raise TypeError("Expected a dictionary")
+
+        key_path = as_key_path(key)
+        with self.get_and_set_lock:
+            deleted = self.delete_value_locked(key_path)
+            if deleted is True:
+                if self.journal is not None:
+                    self.journal.append_delete(key_path.key)
+                self.notify_changed(key_path)
+
+        self.print_debug("dictionary_delete: '{}': {}", key, deleted)
+        return deleted
+
+    #
+    # When `undo` is given, records what's needed to take the change back.
+    #
+    # Must hold `get_and_set_lock`
+    #
+    def delete_value_locked(self, key_path: KeyPath, undo: list = None) -> bool:
+        self.touch_key_path(key_path, True)
+
+        parents = [self.dictionary]
+        for sub_key in key_path.parent:
+            sub_dict = parents[-1].get(sub_key)
+            if isinstance(sub_dict, dict) is False:
+                return False
+            parents.append(sub_dict)
+
+        if key_path.leaf not in parents[-1]:
+            return False
+        old_value = parents[-1].pop(key_path.leaf)
+        if undo is not None:
+            undo.append((parents[-1], key_path.leaf, old_value))
+
+        for i in range(len(key_path.parent), 0, -1):
+            if len(parents[i]) > 0:
+                break
+            del parents[i - 1][key_path.parent[i - 1]]
+            if undo is not None:
+                undo.append((parents[i - 1], key_path.parent[i - 1], parents[i]))
+
+        # Cached parents may have just been removed from the tree
+        self.parent_cache.clear()
+        return True
+
+    def batch(self) -> DataBatch:
+        return DataBatch(self)
+
+    #
+    # Applies every change in `batch` under one lock, as one journal
+    # record. If one of them fails, the ones before it are undone
+    # and the error is raised, leaving the tree as it was.
+    #
+    def apply_batch(self, batch: DataBatch) -> None:
+        # Type Hint
+        if isinstance(self.dictionary, dict) is False:
+            raise TypeError("Expected a dictionary")
+
+        undo = []
+        with self.get_and_set_lock:
+            try:
+                for operation in batch.operations:
+                    if operation[0] == "s":
+                        self.set_value_locked(operation[1], operation[2], undo)
+                    else:
+                        self.delete_value_locked(operation[1], undo)
+            except Exception:
+                for sub_dict, sub_key, old_value in reversed(undo):
+                    if old_value is JsonDictionary.MISSING:
+                        sub_dict.pop(sub_key, None)
+                    else:
+                        sub_dict[sub_key] = old_value
+                self.parent_cache.clear()
+                raise
+
+            if self.journal is not None:
+                self.journal.append_batch(batch.get_journal_records())
+            for operation in batch.operations:
+                self.notify_changed(operation[1])
+
+        self.print_debug("apply_batch: {} changes", len(batch.operations))
+
+    #
+    # Removes empty dictionaries from `tree`, including ones left empty by
+    # that. Returns how many were removed and roughly how much memory they
+    # used, counting the dictionaries and their keys.
+    #
+    @staticmethod
+    def prune_empty_dictionaries(tree: dict) -> tuple[int, int]:
+        removed = 0
+        freed_bytes = 0
+        for key in list(tree.keys()):
+            value = tree[key]
+            if isinstance(value, dict) is False:
+                continue
+
+            sub_removed, sub_freed_bytes = JsonDictionary.prune_empty_dictionaries(value)
+            removed += sub_removed
+            freed_bytes += sub_freed_bytes
+
+            if len(value) < 1:
+                removed += 1
+                freed_bytes += sys.getsizeof(value) + sys.getsizeof(key)
+                del tree[key]
+        return removed, freed_bytes
+
+    #
+    # Prunes empty dictionaries from everything in memory, including loaded
+    # shards. They're written out by the next checkpoint.
+    #
+    # Must be called with `checkpoint_lock` and `get_and_set_lock` held.
+    #
+    def prune_empty_nodes(self) -> tuple[int, int]:
+        removed = 0
+        freed_bytes = 0
+        for root in list(self.dictionary.keys()):
+            value = self.dictionary[root]
+            if self.shards is None or self.shards.is_sharded_root(root) is False or isinstance(value, dict) is False:
+                continue
+            for shard_id in list(value.keys()):
+                shard_removed, shard_freed_bytes = JsonDictionary.prune_empty_dictionaries({shard_id: value[shard_id]})
+                if shard_removed > 0:
+                    if len(value[shard_id]) < 1:
+                        del value[shard_id]
+                    self.shards.mark_dirty((root, shard_id))
+                    removed += shard_removed
+                    freed_bytes += shard_freed_bytes
+
+        tree_removed, tree_freed_bytes = JsonDictionary.prune_empty_dictionaries(self.dictionary)
+
+        # Re-freeze everything on the next snapshot
+        self.frozen_children = {}
+        self.parent_cache = {}
+        return removed + tree_removed, freed_bytes + tree_freed_bytes
+
+    def apply_journal_record(self, record: list) -> None:
+        if record[0] == "s":
+            self.dictionary_set(record[1], record[2])
+        elif record[0] == "d":
+            self.dictionary_delete(record[1])
+        elif record[0] == "t":
+            batch = DataBatch()
+            for sub_record in record[1]:
+                if sub_record[0] == "s":
+                    batch.set(sub_record[1], sub_record[2])
+                else:
+                    batch.delete(sub_record[1])
+            self.apply_batch(batch)
+        else:
+            raise ValueError(f"Unknown journal record type '{record[0]}'")
+
+    #
+    # Takes a consistent, immutable copy of the tree (leaving out sharded
+    # data, which lives in its own files), as quickly as possible so the
+    # lock is only held briefly. Turn it back into a tree with `thaw()`,
+    # which can happen on another thread.
+    #
+    # Each second level sub-tree (such as `debug.type`) is frozen into
+    # marshal bytes. Sub-trees that haven't been changed through
+    # `dictionary_set()` since the last snapshot reuse their frozen copy,
+    # so the time the lock is held grows with what changed, not with the
+    # size of the tree. marshal handles exactly the types that can be
+    # stored here and is much faster than `copy.deepcopy()`.
+    #
+    # Must be called with `get_and_set_lock` held.
+    #
+    def freeze_main_tree(self) -> dict:
+        changed = self.changed_children
+        self.changed_children = set()
+
+        frozen = {}
+        frozen_children = {}
+        for key, value in self.dictionary.items():
+            if self.shards is not None and self.shards.is_sharded_root(key):
+                continue
+            if isinstance(value, dict) is False:
+                frozen[key] = marshal.dumps(value)
+                continue
+
+            previous = self.frozen_children.get(key, {})
+            if (key, None) in changed:
+                previous = {}
+
+            children = {}
+            for child_key, child_value in value.items():
+                child = previous.get(child_key)
+                if child is None or (key, child_key) in changed:
+                    child = marshal.dumps(child_value)
+                children[child_key] = child
+            frozen_children[key] = children
+            frozen[key] = children
+
+        self.frozen_children = frozen_children
+        return frozen
+
+    @staticmethod
+    def thaw(frozen: dict) -> dict:
+        tree = {}
+        for key, value in frozen.items():
+            if isinstance(value, dict):
+                tree[key] = {child_key: marshal.loads(child) for child_key, child in value.items()}
+            else:
+                tree[key] = marshal.loads(value)
+        return tree
+
+    def snapshot(self) -> dict:
+        with self.get_and_set_lock:
+            frozen = self.freeze_main_tree()
+        return JsonDictionary.thaw(frozen)
+
+    #
+    # Replaces everything in memory with `tree`, forgetting loaded shards and
+    # journaled changes. Used after the files on disk have been replaced,
+    # such as when restoring a backup.
+    #
+    # Must be called with `checkpoint_lock` and `get_and_set_lock` held.
+    #
+    def replace_tree(self, tree: dict) -> None:
+        self.dictionary.clear()
+        self.dictionary.update(tree)
+        self.frozen_children = {}
+        self.changed_children = set()
+        self.parent_cache = {}
+        self.notify_changed(None)
+
+        if self.shards is not None:
+            self.shards.loaded.clear()
+            self.shards.evicted.clear()
+        if self.journal is not None:
+            self.journal.rotate()
+            self.journal.remove_rotated()
+
+    #
+    # Saves the tree to `file_name` and drops the journal entries it now contains.
+    # Safe to call from a worker thread while other threads keep making
+    # changes. They are only held up while the snapshot is taken.
+    #
+    def checkpoint(self, file_name: str, serializer) -> None:
+        with self.checkpoint_lock:
+            with self.get_and_set_lock:
+                frozen = self.freeze_main_tree()
+                dirty_shards = []
+                if self.shards is not None:
+                    dirty_shards = self.shards.copy_dirty_shards(self.dictionary)
+                # The fsync and file moves happen after the lock is released
+                if self.journal is not None:
+                    self.journal.mark_rotation()
+
+            if self.journal is not None:
+                self.journal.commit()
+            write_data_file_atomic(JsonDictionary.thaw(frozen), file_name, serializer)
+            for root, shard_id, version, data in dirty_shards:
+                self.shards.write_shard(root, shard_id, data)
+
+            if self.journal is not None:
+                self.journal.remove_rotated()
+
+            with self.get_and_set_lock:
+                for root, shard_id, version, data in dirty_shards:
+                    self.shards.mark_saved(root, shard_id, version)
 
 
 #
-# On Connect
+# Stores the same dotted-key tree as `JsonDictionary`, but as one
+# SQLite row per leaf value, keyed by the leaf's full dotted path.
 #
+# Setting a value is a single row upsert instead of rewriting the whole
+# file, and reading a sub-dictionary (such as `hangman.<channel>`) is a
+# range scan over the primary key index for everything starting with
+# `<key>.`. Sub-dictionaries returned by `dictionary_get()` are copies,
+# so changes have to be written back with `dictionary_set()`.
+#
+class SqliteDictionary(object):
+    def __init__(self, name: str = "unnamed", file_name: str = ":memory:"):
+        self.name = name
+        self.file_name = file_name
+        self.lock = threading.Lock()
+        self.subtree_locks = SubtreeLocks()
+        self.change_listeners = []
 
+        self.connection = sqlite3.connect(file_name, isolation_level = None, check_same_thread = False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS data (path TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID")
 
-@bot.event
-async def on_ready():
-    log("Populating data...")
+    def get_string_prefix(self):
+        return f"<SqliteDictionary {self.name}>"
+
+    def __str__(self):
+        return self.get_string_prefix()
+
+    # See `JsonDictionary.add_change_listener()`
+    def add_change_listener(self, listener) -> None:
+        self.change_listeners.append(listener)
+
+    def notify_changed(self, key_path: KeyPath | None) -> None:
+        for listener in self.change_listeners:
+            listener(key_path)
+
+    # `message` is a format string for `args`, see `debug_lazy()`
+    def print_debug(self, message: str, *args):
+        debug_lazy("dictionary", "{} " + message, self, *args)
+
+    # Every key that starts with `key.` sorts between `key.` and `key/`
+    @staticmethod
+    def get_prefix_range(key: str) -> tuple[str, str]:
+        return f"{key}.", f"{key}/"
+
+    @staticmethod
+    def flatten(key: str, value, rows: list) -> None:
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                SqliteDictionary.flatten(f"{key}.{sub_key}", sub_value, rows)
+        else:
+            rows.append((key, json.dumps(value, separators = (',', ':'))))
+
+    @staticmethod
+    def unflatten(prefix_length: int, rows) -> dict:
+        tree = {}
+        for path, value in rows:
+            split_key = path[prefix_length:].split('.')
+            curr_dict = tree
+            for sub_key in split_key[:-1]:
+                curr_dict = curr_dict.setdefault(sub_key, {})
+            curr_dict[split_key[-1]] = json.loads(value)
+        return tree
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            row = self.connection.execute("SELECT 1 FROM data LIMIT 1").fetchone()
+        return row is None
+
+    def count_rows(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+
+    def dictionary_get(self, key: str | KeyPath):
+        key = as_key_path(key).key
+        with self.lock:
+            value = self.get_value_locked(key)
+
+        self.print_debug("dictionary_get: '{}': '{}'", key, value)
+        return value
+
+    # Values are always read into new objects, so they're already safe to keep
+    def dictionary_get_copy(self, key: str | KeyPath):
+        return self.dictionary_get(key)
+
+    # Reads several keys under one lock, so they're consistent with each other
+    def dictionary_get_many(self, keys: list) -> list:
+        with self.lock:
+            values = [self.get_value_locked(as_key_path(key).key) for key in keys]
+
+        self.print_debug("dictionary_get_many: '{}': '{}'", keys, values)
+        return values
+
+    # Must hold `lock`
+    def get_value_locked(self, key: str):
+        row = self.connection.execute("SELECT value FROM data WHERE path = ?", (key,)).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+
+        low, high = SqliteDictionary.get_prefix_range(key)
+        rows = self.connection.execute("SELECT path, value FROM data WHERE path >= ? AND path < ?", (low, high)).fetchall()
+        if len(rows) < 1:
+            return None
+        return SqliteDictionary.unflatten(len(low), rows)
+
+    # Must hold `lock`
+    def check_can_set(self, key_path: KeyPath) -> None:
+        key = key_path.key
+        parts = key_path.parts
+        parents = [".".join(parts[:i]) for i in range(1, len(parts))]
+        if len(parents) > 0:
+            placeholders = ",".join(["?"] * len(parents))
+            row = self.connection.execute(f"SELECT path FROM data WHERE path IN ({placeholders}) LIMIT 1", parents).fetchone()
+            if row is not None:
+                raise TypeError(f"Expected a dictionary, but found a non-dictionary at {row[0]}")
+
+        low, high = SqliteDictionary.get_prefix_range(key)
+        row = self.connection.execute("SELECT 1 FROM data WHERE path >= ? AND path < ? LIMIT 1", (low, high)).fetchone()
+        if row is not None:
+            raise TypeError(f"Expected a non-dictionary, but found a dictionary at {key}")
+
+    def dictionary_set(self, key: str | KeyPath, value):
+        key_path = as_key_path(key)
+        rows = []
+        SqliteDictionary.flatten(key_path.key, value, rows)
+
+        with self.lock:
+            if len(rows) == 1 and rows[0][0] == key_path.key:
+                self.set_rows_locked(key_path, rows)
+            else:
+                self.run_in_transaction(lambda: self.set_rows_locked(key_path, rows))
+            self.notify_changed(key_path)
+
+        self.print_debug("dictionary_set: '{}' to '{}'", key, value)
+
+    # Must hold `lock`, and be in a transaction when more than one row changes
+    def set_rows_locked(self, key_path: KeyPath, rows: list) -> None:
+        self.check_can_set(key_path)
+        if len(rows) != 1 or rows[0][0] != key_path.key:
+            self.connection.execute("DELETE FROM data WHERE path = ?", (key_path.key,))
+        self.connection.executemany("INSERT OR REPLACE INTO data (path, value) VALUES (?, ?)", rows)
+
+    # Empty dictionaries can't be stored here, so there are no parents to prune
+    def dictionary_delete(self, key: str | KeyPath) -> bool:
+        key_path = as_key_path(key)
+        key = key_path.key
+        with self.lock:
+            deleted = self.delete_rows_locked(key)
+            if deleted is True:
+                self.notify_changed(key_path)
+
+        self.print_debug("dictionary_delete: '{}': {}", key, deleted)
+        return deleted
+
+    # Must hold `lock`
+    def delete_rows_locked(self, key: str) -> bool:
+        low, high = SqliteDictionary.get_prefix_range(key)
+        cursor = self.connection.execute("DELETE FROM data WHERE path = ? OR (path >= ? AND path < ?)", (key, low, high))
+        return cursor.rowcount > 0
+
+    # Must hold `lock`
+    def run_in_transaction(self, function) -> None:
+        self.connection.execute("BEGIN")
+        try:
+            function()
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def batch(self) -> DataBatch:
+        return DataBatch(self)
+
+    # Applies every change in `batch` in one SQLite transaction
+    def apply_batch(self, batch: DataBatch) -> None:
+        def apply_operations():
+            for operation in batch.operations:
+                if operation[0] == "s":
+                    rows = []
+                    SqliteDictionary.flatten(operation[1].key, operation[2], rows)
+                    self.set_rows_locked(operation[1], rows)
+                else:
+                    self.delete_rows_locked(operation[1].key)
+
+        with self.lock:
+            self.run_in_transaction(apply_operations)
+            for operation in batch.operations:
+                self.notify_changed(operation[1])
+
+        self.print_debug("apply_batch: {} changes", len(batch.operations))
+
+    def import_tree(self, tree: dict) -> int:
+        rows = []
+        for key, value in tree.items():
+            SqliteDictionary.flatten(key, value, rows)
+
+        with self.lock:
+            self.run_in_transaction(lambda: self.connection.executemany("INSERT OR REPLACE INTO data (path, value) VALUES (?, ?)", rows))
+            self.notify_changed(None)
+        return len(rows)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            rows = self.connection.execute("SELECT path, value FROM data").fetchall()
+        return SqliteDictionary.unflatten(0, rows)
+
+    # Writes a consistent copy of the database to `file_name`
+    def copy_to(self, file_name: str) -> None:
+        destination = sqlite3.connect(file_name)
+        try:
+            with self.lock:
+                self.connection.backup(destination)
+        finally:
+            destination.close()
+
+    # Replaces the contents of the database with the database in `file_name`
+    def restore_from(self, file_name: str) -> None:
+        source = sqlite3.connect(file_name)
+        try:
+            with self.lock:
+                source.backup(self.connection)
+                self.notify_changed(None)
+        finally:
+            source.close()
+
+    # Folds the write-ahead log back into the database file
+    def checkpoint(self) -> None:
+        with self.lock:
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "file": self.file_name,
+            "rows": self.count_rows(),
+        }
+
+
+#
+# Loads everything the JSON backend has stored (main file, shard files
+# and journal) into one in-memory tree, for importing into another backend.
+#
+def load_full_json_tree() -> dict:
+    tree = load_json_data(MAIN_DATA_FILE)
+
+    for root in SHARDED_DATA_ROOTS:
+        root_dir = os.path.join(DATA_SHARD_DIR, root)
+        if os.path.isdir(root_dir) is False:
+            continue
+        for file_name in os.listdir(root_dir):
+            if file_name.endswith(".json") is False:
+                continue
+            shard_data = read_data_file(os.path.join(root_dir, file_name))
+            tree.setdefault(root, {})[file_name[:-len(".json")]] = shard_data
+
+    dictionary = JsonDictionary(name = "import", dictionary = tree)
+    DataJournal(MAIN_DATA_JOURNAL_FILE).replay(dictionary)
+    return tree
+
+
+if DATA_BACKEND != "json" and DATA_BACKEND != "sqlite":
+    raise ValueError(f"Unknown DATA_BACKEND '{DATA_BACKEND}', expected 'json' or 'sqlite'")
+
+# Set by `load_main_bot_data()`, which runs in the background while the bot connects
+main_bot_data = None
+main_data_journal = None
+main_bot_data_ready = asyncio.Event()
+
+
+# Everything that caches bot data in memory and must hear about changes to it
+def attach_data_listeners(dictionary) -> None:
+    permission_engine.attach(dictionary)
+    hangman_sessions.attach(dictionary)
+    wordle_sessions.attach(dictionary)
+
+
+early_checkpoint_lock = threading.Lock()
+early_checkpoint_thread = None
+
+
+#
+# Saves bot data on its own thread when too many changed shards are
+# waiting to be written. Like journal compaction, it doesn't wait for
+# the next autosave, and it does nothing if one is already running.
+#
+def start_early_checkpoint(dictionary) -> None:
+    global early_checkpoint_thread
+    with early_checkpoint_lock:
+        if early_checkpoint_thread is not None and early_checkpoint_thread.is_alive():
+            return
+        early_checkpoint_thread = threading.Thread(target = run_early_checkpoint, args = (dictionary,),
+                                                   name = "early-checkpoint", daemon = True)
+        early_checkpoint_thread.start()
+
+
+def run_early_checkpoint(dictionary) -> None:
+    debug_lazy("shards", "Too many changed shards are waiting, saving early")
+    try:
+        dictionary.checkpoint(MAIN_DATA_FILE, main_data_serializer)
+    except Exception as error:
+        log(f"Early save failed: {error}")
+
+
+# Must not be called on the event loop
+def load_main_bot_data() -> None:
+    global main_bot_data
+    global main_data_journal
+
+    if DATA_BACKEND == "sqlite":
+        main_bot_data = SqliteDictionary(name = "main_data", file_name = DATA_SQLITE_FILE)
+        if main_bot_data.is_empty() and os.path.exists(MAIN_DATA_FILE):
+            imported = main_bot_data.import_tree(load_full_json_tree())
+            log(f"Imported {imported} values from {MAIN_DATA_FILE} into {DATA_SQLITE_FILE}")
+        attach_data_listeners(main_bot_data)
+        return
+
+    dictionary = JsonDictionary(name = "main_data", dictionary = load_json_data(MAIN_DATA_FILE))
+
+    if DATA_SHARDS_ENABLED is True:
+        shards = DataShardStore(DATA_SHARD_DIR, SHARDED_DATA_ROOTS, max_loaded = DATA_SHARD_CACHE_SIZE,
+                                serializer = get_shard_serializer(main_data_serializer))
+        shards.on_full = lambda: start_early_checkpoint(dictionary)
+        dictionary.attach_shard_store(shards)
+
+    if DATA_JOURNAL_ENABLED is True:
+        journal = DataJournal(MAIN_DATA_JOURNAL_FILE, commit_interval = DATA_JOURNAL_COMMIT_INTERVAL_SECONDS,
+                              compact_bytes = DATA_JOURNAL_COMPACT_BYTES)
+        replayed = journal.replay(dictionary)
+        if replayed > 0:
+            log(f"Replayed {replayed} changes from {MAIN_DATA_JOURNAL_FILE}")
+        journal.on_compact = lambda: dictionary.checkpoint(MAIN_DATA_FILE, main_data_serializer)
+        dictionary.attach_journal(journal)
+        journal.start()
+        main_data_journal = journal
+
+    attach_data_listeners(dictionary)
+    main_bot_data = dictionary
+
+
+#
+# Saves bot data without blocking the event loop. The snapshot,
+# serialization and file writes all happen on a worker thread.
+#
+async def save_main_bot_data(backup: bool = False) -> None:
+    async with data_lock:
+        if DATA_BACKEND == "sqlite":
+            await asyncio.to_thread(main_bot_data.checkpoint)
+        else:
+            await asyncio.to_thread(main_bot_data.checkpoint, MAIN_DATA_FILE, main_data_serializer)
+
+        if backup is True:
+            await asyncio.to_thread(backup_main_bot_data)
+
+
+# Stored name -> path of every file that makes up the JSON bot data
+def get_json_data_files() -> dict:
+    files = {}
+    if os.path.exists(MAIN_DATA_FILE):
+        files[MAIN_DATA_FILE] = MAIN_DATA_FILE
+
+    for root in SHARDED_DATA_ROOTS:
+        root_dir = os.path.join(DATA_SHARD_DIR, root)
+        if os.path.isdir(root_dir) is False:
+            continue
+        for file_name in os.listdir(root_dir):
+            if file_name.endswith(".json"):
+                path = os.path.join(root_dir, file_name)
+                files[path] = path
+    return files
+
+
+# Must be called after saving, and not on the event loop
+def backup_main_bot_data():
+    try:
+        if DATA_BACKEND == "sqlite":
+            temp_file_name = f"{DATA_SQLITE_FILE}.backup.tmp"
+            main_bot_data.copy_to(temp_file_name)
+            try:
+                return backup_store.create({DATA_SQLITE_FILE: temp_file_name})
+            finally:
+                os.remove(temp_file_name)
+        return backup_store.create(get_json_data_files())
+    except OSError as error:
+        log(f"Failed to back up bot data: {error}")
+        return None
+
+
+#
+# Rewrites the main data file and every shard file in another format,
+# and keeps using that format until the bot is restarted.
+#
+# Must be called while holding `data_lock`, and not on the event loop.
+#
+def convert_main_bot_data(serializer) -> int:
+    global main_data_serializer
+
+    # Files are only written while holding `checkpoint_lock`, so rewriting them
+    # doesn't need the dictionary's lock, which would stall every read and write
+    with main_bot_data.checkpoint_lock:
+        with main_bot_data.get_and_set_lock:
+            main_data_serializer = serializer
+            if main_bot_data.shards is not None:
+                main_bot_data.shards.serializer = get_shard_serializer(serializer)
+            files = get_json_data_files()
+
+        for path in files.values():
+            if path == MAIN_DATA_FILE:
+                write_data_file_atomic(read_data_file(path), path, serializer)
+            else:
+                write_data_file_atomic(read_data_file(path), path, get_shard_serializer(serializer))
+        return len(files)
+
+
+def get_json_data_files_size() -> int:
+    total = 0
+    for path in get_json_data_files().values():
+        total += os.path.getsize(path)
+    return total
+
+
+#
+# Removes empty dictionaries that reads used to leave behind, from memory
+# and from every data file. Returns what was removed and reclaimed.
+#
+# Must be called while holding `data_lock`, and not on the event loop.
+#
+def compact_main_bot_data() -> dict:
+    size_before = get_json_data_files_size()
+    file_nodes_removed = 0
+
+    with main_bot_data.checkpoint_lock:
+        with main_bot_data.get_and_set_lock:
+            memory_nodes_removed, memory_freed_bytes = main_bot_data.prune_empty_nodes()
+
+        # Shards in memory were pruned there, the rest only exist as files.
+        # Those are only written while holding `checkpoint_lock`, so they're
+        # rewritten without stalling reads and writes of the dictionary.
+        shards = main_bot_data.shards
+        for path in get_json_data_files().values():
+            if path == MAIN_DATA_FILE or shards is None:
+                continue
+            root = os.path.basename(os.path.dirname(path))
+            shard_id = os.path.basename(path)[:-len(".json")]
+            with main_bot_data.get_and_set_lock:
+                in_memory = shards.is_in_memory(root, shard_id)
+            if in_memory is True:
+                continue
+
+            tree = {shard_id: read_data_file(path)}
+            removed, _ = JsonDictionary.prune_empty_dictionaries(tree)
+            if removed > 0:
+                shards.write_shard(root, shard_id, tree.get(shard_id))
+                file_nodes_removed += removed
+
+    main_bot_data.checkpoint(MAIN_DATA_FILE, main_data_serializer)
+
+    return {
+        "memory_nodes": memory_nodes_removed,
+        "memory_bytes": memory_freed_bytes,
+        "file_nodes": file_nodes_removed,
+        "disk_bytes": size_before - get_json_data_files_size(),
+    }
+
+
+# Must be called while holding `data_lock`, and not on the event loop
+def restore_main_bot_data(backup: dict) -> None:
+    backup_store.verify(backup)
+
+    if DATA_BACKEND == "sqlite":
+        temp_file_name = f"{DATA_SQLITE_FILE}.restore.tmp"
+        backup_store.extract(backup, DATA_SQLITE_FILE, temp_file_name)
+        try:
+            main_bot_data.restore_from(temp_file_name)
+        finally:
+            os.remove(temp_file_name)
+        return
+
+    # Everything slow happens before the dictionary is locked, so reads and
+    # writes only wait for the files to be moved into place
+    with main_bot_data.checkpoint_lock:
+        temp_files = {}
+        try:
+            for name in backup["files"].keys():
+                temp_file_name = f"{name}.restore.tmp"
+                backup_store.extract(backup, name, temp_file_name)
+                temp_files[name] = temp_file_name
+            tree = load_json_data(temp_files[MAIN_DATA_FILE]) if MAIN_DATA_FILE in temp_files else {}
+
+            # Shard files that didn't exist when the backup was made
+            stale_files = [path for path in get_json_data_files().keys() if path not in backup["files"]]
+
+            with main_bot_data.get_and_set_lock:
+                for path in stale_files:
+                    os.remove(path)
+                for name, temp_file_name in temp_files.items():
+                    os.replace(temp_file_name, name)
+                temp_files = {}
+                main_bot_data.replace_tree(tree)
+        finally:
+            for temp_file_name in temp_files.values():
+                if os.path.exists(temp_file_name):
+                    os.remove(temp_file_name)
+
+
+async def autosave_main_bot_data() -> None:
+    while True:
+        await asyncio.sleep(DATA_AUTOSAVE_INTERVAL_SECONDS)
+        start = time.monotonic()
+        try:
+            await save_main_bot_data(backup = True)
+        except Exception as error:
+            log(f"Autosave failed: {error}")
+            continue
+        debug_lazy("json_data", "Autosaved in {:.3f}s", time.monotonic() - start)
+
+
+#
+# WORDS
+#
+
+#
+# All words of one length, sorted and packed end to end into a single
+# bytes object, `width` bytes per word. Words are UTF-8, so a word with
+# non-ASCII letters can be longer than the others of its length in
+# bytes; the shorter ones are padded with zero bytes, which keeps
+# them in the same order.
+#
+# `by_difficulty` holds the index of every word, from the word with
+# the most common letters to the one with the rarest, so the words of
+# each difficulty are one range of it.
+#
+class WordBucket(object):
+    __slots__ = ("length", "width", "data", "count", "by_difficulty")
+
+    def __init__(self, length: int, words: list[str], letter_frequency: dict = None):
+        encoded = sorted([word.encode() for word in words])
+        self.length = length
+        self.width = max([len(word) for word in encoded]) if len(encoded) > 0 else length
+        self.data = b"".join([word.ljust(self.width, b"\0") for word in encoded])
+        self.count = len(encoded)
+
+        if letter_frequency is None:
+            letter_frequency = {}
+        scores = [get_word_difficulty(word.decode(), letter_frequency) for word in encoded]
+        self.by_difficulty = array.array("I", sorted(range(0, self.count), key = scores.__getitem__))
+
+    # Lets `bisect` search the bucket like a sorted list of bytes
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = index * self.width
+        return self.data[start:start + self.width]
+
+    def get_word(self, index: int) -> str:
+        return self[index].rstrip(b"\0").decode()
+
+    # Returns the range of `by_difficulty` with the words of a difficulty, or all of them for None
+    def get_difficulty_range(self, difficulty: str = None) -> tuple[int, int]:
+        if difficulty is None:
+            return 0, self.count
+        tier = WORD_DIFFICULTIES.index(difficulty)
+        return self.count * tier // len(WORD_DIFFICULTIES), self.count * (tier + 1) // len(WORD_DIFFICULTIES)
+
+    # Returns -1 if the word isn't in the bucket
+    def index(self, word: str) -> int:
+        encoded = word.encode()
+        if len(encoded) > self.width:
+            return -1
+        encoded = encoded.ljust(self.width, b"\0")
+        index = bisect.bisect_left(self, encoded)
+        if index < self.count and self[index] == encoded:
+            return index
+        return -1
+
+    def contains(self, word: str) -> bool:
+        return self.index(word) >= 0
+
+
+#
+# The words games are played with, loaded from `WORDLE_WORDS_FILE`.
+# Words are lowercased and deduplicated, and kept in one `WordBucket`
+# per length, so a list of 300k words takes a few MB.
+# A loaded dictionary is never changed. Reloading builds a new one
+# and replaces the global `word_dictionary`.
+#
+class WordDictionary(object):
+    def __init__(self, words_by_length: dict[int, list[str]] = None, file_name: str = "", skipped: int = 0):
+        self.file_name = file_name
+        self.skipped = skipped
+        self.buckets = {}
+        self.count = 0
+        if words_by_length is not None:
+            letter_frequency = get_letter_frequency(words_by_length.values())
+            for length in sorted(words_by_length.keys()):
+                bucket = WordBucket(length, words_by_length[length], letter_frequency)
+                self.buckets[length] = bucket
+                self.count += bucket.count
+
+    #
+    # Reads the file one line at a time. Lines that aren't a single word
+    # of letters and digits are skipped, since they could never be
+    # guessed in a game.
+    #
+    @staticmethod
+    def load(file_name: str):
+        debug("words", f"Loading words from {file_name}")
+        words_by_length = {}
+        skipped = 0
+        with open(file_name, encoding = "utf-8") as f:
+            for line in f:
+                word = line.strip().lower()
+                if word == "":
+                    continue
+                if word.isalnum() is False:
+                    skipped += 1
+                    continue
+                words = words_by_length.get(len(word))
+                if words is None:
+                    words = set()
+                    words_by_length[len(word)] = words
+                words.add(word)
+        return WordDictionary({length: list(words) for length, words in words_by_length.items()}, file_name = file_name, skipped = skipped)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, word: str) -> bool:
+        word = word.lower()
+        bucket = self.buckets.get(len(word))
+        if bucket is None:
+            return False
+        return bucket.contains(word)
+
+    def get_lengths(self) -> list[int]:
+        return list(self.buckets.keys())
+
+    def count_words(self, length: int) -> int:
+        bucket = self.buckets.get(length)
+        return bucket.count if bucket is not None else 0
+
+    # Every word is equally likely, whatever its length
+    def random_word(self, length: int = None):
+        if length is not None:
+            bucket = self.buckets.get(length)
+            if bucket is None or bucket.count < 1:
+                return None
+            return bucket.get_word(random.randrange(bucket.count))
+
+        if self.count < 1:
+            return None
+        index = random.randrange(self.count)
+        for bucket in self.buckets.values():
+            if index < bucket.count:
+                return bucket.get_word(index)
+            index -= bucket.count
+        return None
+
+    #
+    # Picks a random word with a length from `min_length` to `max_length`
+    # and of the given difficulty, any of them when None. Words in
+    # `exclude` are only picked if a few tries in a row all land on one.
+    # Every matching word is equally likely.
+    #
+    def pick_word(self, min_length: int = None, max_length: int = None, difficulty: str = None, exclude = None):
+        ranges = []
+        total = 0
+        for length, bucket in self.buckets.items():
+            if (min_length is not None and length < min_length) or (max_length is not None and length > max_length):
+                continue
+            start, stop = bucket.get_difficulty_range(difficulty)
+            if stop > start:
+                ranges.append((bucket, start, stop))
+                total += stop - start
+        if total < 1:
+            return None
+
+        word = None
+        for _ in range(0, 8):
+            index = random.randrange(total)
+            for bucket, start, stop in ranges:
+                if index < stop - start:
+                    word = bucket.get_word(bucket.by_difficulty[start + index])
+                    break
+                index -= stop - start
+            if exclude is None or word not in exclude:
+                break
+        return word
+
+    def get_stats(self) -> dict:
+        return {
+            "file": self.file_name,
+            "words": self.count,
+            "lengths": len(self.buckets),
+            "skipped_lines": self.skipped,
+            "bytes": sum([len(bucket.data) for bucket in self.buckets.values()]),
+        }
+
+
+#
+# How often each letter appears across all the words, counting each
+# word once however many times it has the letter
+#
+def get_letter_frequency(word_lists) -> dict:
+    counts = Counter()
+    total = 0
+    for words in word_lists:
+        counts.update(itertools.chain.from_iterable(map(set, words)))
+        total += len(words)
+    if total < 1:
+        return {}
+    return {letter: count / total for letter, count in counts.items()}
+
+
+# From 0 for a word made of the most common letters to 1 for one made of letters no other word has
+def get_word_difficulty(word: str, letter_frequency: dict) -> float:
+    if len(word) < 1:
+        return 0.0
+    return 1.0 - sum(map(letter_frequency.get, word, itertools.repeat(0.0))) / len(word)
+
+
+#
+# The last few random words used in each channel, so the same word
+# doesn't come up again right away
+#
+class RecentWords(object):
+    def __init__(self, per_channel: int, max_channels: int):
+        self.per_channel = per_channel
+        self.max_channels = max_channels
+        self.channels = OrderedDict()
+
+    def get(self, channel_id: int) -> deque:
+        words = self.channels.get(channel_id)
+        if words is None:
+            words = deque(maxlen = self.per_channel)
+            self.channels[channel_id] = words
+        self.channels.move_to_end(channel_id)
+        while len(self.channels) > self.max_channels:
+            self.channels.popitem(last = False)
+        return words
+
+
+#
+# Reads the optional arguments of the random game commands: a length
+# such as `6`, a range such as `5-8`, and a difficulty, in any order.
+# Returns (min length, max length, difficulty), raises ValueError with
+# a message for the user.
+#
+def parse_word_options(options) -> tuple:
+    min_length = None
+    max_length = None
+    difficulty = None
+    for option in options:
+        option = option.lower()
+        if option in WORD_DIFFICULTIES:
+            difficulty = option
+            continue
+
+        match = re.fullmatch(r"(\d+)(?:-(\d+))?", option)
+        if match is None:
+            raise ValueError(f"I don't understand `{option}`. Give me a length like `6` or `5-8`, and `easy`, `medium` or `hard`.")
+        min_length = int(match.group(1))
+        max_length = int(match.group(2)) if match.group(2) is not None else min_length
+        if min_length > max_length:
+            min_length, max_length = max_length, min_length
+    return min_length, max_length, difficulty
+
+
+word_dictionary = WordDictionary()
+recent_words = RecentWords(RECENT_WORDS_PER_CHANNEL, RECENT_WORDS_CHANNELS_KEPT)
+register_debug_channel("words")
+
+
+# Builds the new dictionary in a thread, the old one is used until it's done
+async def reload_word_dictionary() -> WordDictionary:
+    global word_dictionary
+    if WORDLE_WORDS_FILE is None or WORDLE_WORDS_FILE == "":
+        return word_dictionary
+    word_dictionary = await asyncio.to_thread(WordDictionary.load, WORDLE_WORDS_FILE)
+    debug_lazy("words", lambda: f"Loaded word dictionary: {word_dictionary.get_stats()}")
+    opened = await asyncio.to_thread(get_wordle_hints().open_cached)
+    debug_lazy("words", "Opened {} cached Wordle hint matrices", opened)
+    return word_dictionary
+
+
+#
+# Feedback patterns (see `get_wordle_feedback_pattern()`) for every
+# guess against every answer of one word length. Row `g` holds the
+# pattern guess `g` gets against each answer, in the bucket's order:
+# one byte per pattern for words of up to five letters, two bytes for
+# up to ten.
+#
+# The matrix is written to a file once per word list and memory-mapped
+# from then on, so only the rows a hint actually reads come from disk.
+# The header also records the best first guess, which is the one hint
+# that would otherwise have to read the whole matrix.
+#
+class WordleHintMatrix(object):
+    MAGIC = b"RCWH\x01"
+    HEADER = struct.Struct("<5sBxxII")
+
+    def __init__(self, bucket: WordBucket, file_name: str):
+        self.bucket = bucket
+        self.file_name = file_name
+        self.count = bucket.count
+        self.typecode = WordleHintMatrix.get_typecode(bucket.length)
+        self.patterns = None
+        self.best_opener = 0
+
+    @staticmethod
+    def get_typecode(length: int):
+        if 3 ** length <= 256:
+            return "B"
+        if 3 ** length <= 65536:
+            return "H"
+        return None
+
+    def get_file_size(self) -> int:
+        return WordleHintMatrix.HEADER.size + self.count * self.count * array.array(self.typecode).itemsize
+
+    def get_row(self, guess_index: int) -> memoryview:
+        start = guess_index * self.count
+        return self.patterns[start:start + self.count]
+
+    # Returns False if there's no file for this word list yet
+    def open(self) -> bool:
+        try:
+            if os.path.getsize(self.file_name) != self.get_file_size():
+                return False
+        except FileNotFoundError:
+            return False
+
+        with open(self.file_name, "rb") as file:
+            file_map = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, itemsize, count, best_opener = WordleHintMatrix.HEADER.unpack_from(file_map)
+        if magic != WordleHintMatrix.MAGIC or itemsize != array.array(self.typecode).itemsize or count != self.count:
+            file_map.close()
+            return False
+
+        self.patterns = memoryview(file_map)[WordleHintMatrix.HEADER.size:].cast(self.typecode)
+        self.best_opener = best_opener
+        return True
+
+    #
+    # Letters a guess doesn't have can't change its pattern, so they're
+    # blanked out of every answer first. Many answers then look the same
+    # and the pattern is only worked out once for each of them.
+    #
+    def build(self) -> None:
+        bucket = self.bucket
+        split_answers = struct.Struct(f"{bucket.width}s" * bucket.count).unpack
+        best_score = None
+        temp_file_name = f"{self.file_name}.tmp"
+        with open(temp_file_name, "wb") as file:
+            file.write(WordleHintMatrix.HEADER.pack(WordleHintMatrix.MAGIC, array.array(self.typecode).itemsize, self.count, 0))
+            for guess_index in range(self.count):
+                guess = bucket[guess_index]
+                table = bytearray(256)
+                for letter in guess:
+                    table[letter] = letter
+                answers = split_answers(bucket.data.translate(table))
+
+                patterns = dict.fromkeys(answers)
+                for answer in patterns.keys():
+                    patterns[answer] = get_wordle_feedback_pattern(answer, guess)
+                row = array.array(self.typecode, map(patterns.__getitem__, answers))
+                file.write(row.tobytes())
+
+                # Proportional to the number of answers left on average after this guess
+                score = sum([count * count for count in Counter(row).values()])
+                if best_score is None or score < best_score:
+                    best_score = score
+                    self.best_opener = guess_index
+
+            file.seek(0)
+            file.write(WordleHintMatrix.HEADER.pack(WordleHintMatrix.MAGIC, array.array(self.typecode).itemsize, self.count, self.best_opener))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file_name, self.file_name)
+
+    # Keeps the answers that would have given `guess` the pattern it got
+    def filter_candidates(self, candidates: list[int], guess: str, pattern: int) -> list[int]:
+        guess_index = self.bucket.index(guess)
+        if guess_index < 0:
+            return [index for index in candidates if get_wordle_feedback_pattern(self.bucket.get_word(index), guess) == pattern]
+        row = self.get_row(guess_index)
+        return [index for index in candidates if row[index] == pattern]
+
+    #
+    # Suggests the guess that leaves the fewest candidates on average,
+    # out of every word of this length. A guess that could be the answer
+    # wins a tie.
+    #
+    def suggest(self, candidates: list[int]) -> int:
+        if len(candidates) == self.count:
+            return self.best_opener
+        if len(candidates) <= 2:
+            return candidates[0]
+
+        get_patterns = operator.itemgetter(*candidates)
+        candidate_set = set(candidates)
+        best_index = candidates[0]
+        best_score = None
+        for guess_index in range(self.count):
+            score = sum([count * count for count in Counter(get_patterns(self.get_row(guess_index))).values()])
+            if best_score is None or score < best_score or (score == best_score and guess_index in candidate_set and best_index not in candidate_set):
+                best_score = score
+                best_index = guess_index
+        return best_index
+
+
+class WordleHintSession(object):
+    __slots__ = ("word", "guessed", "candidates")
+
+    def __init__(self, word: str, candidates: list[int]):
+        self.word = word
+        self.guessed = []
+        self.candidates = candidates
+
+
+#
+# Hint matrices for one `WordDictionary`, opened or built the first time
+# a length is asked for, and the answers still possible in each channel.
+# Only the guesses made since a channel's last hint are filtered out.
+#
+class WordleHints(object):
+    def __init__(self, dictionary: WordDictionary):
+        self.dictionary = dictionary
+        self.matrices = {}
+        self.tasks = {}
+        self.sessions = OrderedDict()
+        # Hints are worked out in worker threads
+        self.sessions_lock = threading.Lock()
+
+    # Returns why hints can't be given for words of this length, or None if they can
+    def get_unavailable_reason(self, length: int):
+        bucket = self.dictionary.buckets.get(length)
+        if bucket is None:
+            return f"I don't know any words with {length} letters."
+        if bucket.width != length or WordleHintMatrix.get_typecode(length) is None:
+            return f"I can't give hints for words with {length} letters."
+        if bucket.count > WORDLE_HINT_MAX_WORDS:
+            return f"There are too many words with {length} letters for me to give hints."
+        return None
+
+    def get_file_name(self, length: int) -> str:
+        digest = hashlib.sha256(self.dictionary.buckets[length].data).hexdigest()[:16]
+        return os.path.join(WORDLE_HINT_CACHE_DIR, f"wordle-{length}-{digest}.bin")
+
+    def open_or_build(self, length: int) -> WordleHintMatrix:
+        matrix = WordleHintMatrix(self.dictionary.buckets[length], self.get_file_name(length))
+        if matrix.open() is True:
+            return matrix
+
+        start = time.monotonic()
+        os.makedirs(WORDLE_HINT_CACHE_DIR, exist_ok = True)
+        # Files for word lists that aren't used anymore
+        for file_name in os.listdir(WORDLE_HINT_CACHE_DIR):
+            if file_name.startswith(f"wordle-{length}-"):
+                os.remove(os.path.join(WORDLE_HINT_CACHE_DIR, file_name))
+        matrix.build()
+        if matrix.open() is False:
+            raise OSError(f"Built '{matrix.file_name}' but couldn't open it")
+        log(f"Built the Wordle hint matrix for {length} letter words ({matrix.count} words) in {time.monotonic() - start:.1f}s")
+        return matrix
+
+    # Memory-maps the matrices that were already built, builds nothing
+    def open_cached(self) -> int:
+        opened = 0
+        for length in self.dictionary.get_lengths():
+            if self.get_unavailable_reason(length) is not None:
+                continue
+            matrix = WordleHintMatrix(self.dictionary.buckets[length], self.get_file_name(length))
+            if matrix.open() is True:
+                self.matrices[length] = matrix
+                opened += 1
+        return opened
+
+    def is_ready(self, length: int) -> bool:
+        return length in self.matrices
+
+    async def get_matrix(self, length: int) -> WordleHintMatrix:
+        matrix = self.matrices.get(length)
+        if matrix is not None:
+            return matrix
+
+        task = self.tasks.get(length)
+        if task is None:
+            task = asyncio.create_task(asyncio.to_thread(self.open_or_build, length))
+            self.tasks[length] = task
+        try:
+            # Other hints may be waiting on the same build
+            matrix = await asyncio.shield(task)
+        except Exception:
+            if self.tasks.get(length) is task:
+                del self.tasks[length]
+            raise
+        self.matrices[length] = matrix
+        return matrix
+
+    # Must hold `sessions_lock`
+    def get_candidates_locked(self, matrix: WordleHintMatrix, channel_id: int, word: str, guessed: list[str]) -> list[int]:
+        session = self.sessions.get(channel_id)
+        if session is None or session.word != word or guessed[:len(session.guessed)] != session.guessed:
+            session = WordleHintSession(word, list(range(matrix.count)))
+            self.sessions[channel_id] = session
+        self.sessions.move_to_end(channel_id)
+        while len(self.sessions) > WORDLE_HINT_SESSIONS_KEPT:
+            self.sessions.popitem(last = False)
+
+        for guess in guessed[len(session.guessed):]:
+            session.candidates = matrix.filter_candidates(session.candidates, guess, get_wordle_feedback_pattern(word, guess))
+            session.guessed.append(guess)
+        return session.candidates
+
+    # Returns how many words are still possible and the index of the one to
+    # suggest, or `None` when there are none. Reads the matrix, so call it
+    # off the event loop.
+    def get_hint(self, matrix: WordleHintMatrix, channel_id: int, word: str, guessed: list[str]) -> tuple[int, int | None]:
+        with self.sessions_lock:
+            candidates = list(self.get_candidates_locked(matrix, channel_id, word, guessed))
+        if len(candidates) < 1:
+            return 0, None
+        return len(candidates), matrix.suggest(candidates)
+
+
+wordle_hints = None
+
+
+def get_wordle_hints() -> WordleHints:
+    global wordle_hints
+    if wordle_hints is None or wordle_hints.dictionary is not word_dictionary:
+        wordle_hints = WordleHints(word_dictionary)
+    return wordle_hints
+
+
+#
+# STARTUP
+#
+
+
+#
+# Records when each part of startup began and ended, relative to the
+# start of the process. Some parts overlap, since data is loaded while
+# the bot logs in and connects. The report is logged once everything
+# that was started has finished and the bot is ready.
+#
+class StartupTimer(object):
+    def __init__(self, start: float):
+        self.start = start
+        self.phases = {}
+        self.reported = False
+
+    def begin(self, name: str) -> None:
+        self.phases[name] = [time.perf_counter() - self.start, None]
+
+    def end(self, name: str) -> None:
+        if name not in self.phases:
+            self.phases[name] = [0.0, None]
+        if self.phases[name][1] is None:
+            self.phases[name][1] = time.perf_counter() - self.start
+        self.log_report_when_done()
+
+    # Logs what finished so far when startup can't go on, since the report
+    # would otherwise wait for a "ready" that never comes
+    def fail(self, name: str) -> None:
+        self.end(name)
+        if self.reported is True:
+            return
+        self.reported = True
+        log(f"Startup failed during {name}: {self.format_report()}")
+
+    def log_report_when_done(self) -> None:
+        if self.reported is True or "ready" not in self.phases:
+            return
+        for began, ended in self.phases.values():
+            if ended is None:
+                return
+        self.reported = True
+        log(f"Startup: {self.format_report()}")
+
+    def format_report(self) -> str:
+        parts = []
+        for name, (began, ended) in self.phases.items():
+            if ended is None:
+                parts.append(f"{name} started at {began:.3f}s")
+            elif name == "ready":
+                parts.append(f"first READY at {ended:.3f}s")
+            else:
+                parts.append(f"{name} {ended - began:.3f}s (done at {ended:.3f}s)")
+        return ", ".join(parts)
+
+
+startup_timer = StartupTimer(STARTUP_PERF_COUNTER)
+word_list_ready = asyncio.Event()
 
-    # Load debug channel statuses
+
+async def load_main_bot_data_in_background() -> None:
+    startup_timer.begin("data load")
+    try:
+        await asyncio.to_thread(load_main_bot_data)
+    except Exception as error:
+        # Running without the data would overwrite it with nothing on the next save
+        log(f"Failed to load bot data, shutting down: {error}")
+        startup_timer.fail("data load")
+        await bot.close()
+        return
 
     debug_dict = main_bot_data.dictionary_get(DEBUG_CHANNEL_DICT_PATH)
     if isinstance(debug_dict, dict) is True:
         for key in debug_dict.keys():
-            value = debug_dict[key]
-            debug_channel_dict[key] = value
+            set_debug_channel_value(key, debug_dict[key])
+
+    main_bot_data_ready.set()
+    startup_timer.end("data load")
+
+    if DATA_AUTOSAVE_INTERVAL_SECONDS > 0:
+        bot.autosave_task = asyncio.create_task(autosave_main_bot_data())
+
+    if GAME_SWEEP_INTERVAL_SECONDS > 0:
+        bot.game_sweep_task = asyncio.create_task(sweep_game_sessions_periodically())
+
+
+async def load_word_list_in_background() -> None:
+    startup_timer.begin("word list load")
+    try:
+        await reload_word_dictionary()
+    # A file that isn't valid text raises `UnicodeDecodeError`, a `ValueError`
+    except (OSError, ValueError) as error:
+        log(f"Failed to load {WORDLE_WORDS_FILE}: {error}")
+    finally:
+        word_list_ready.set()
+        startup_timer.end("word list load")
+
+
+async def wait_until_ready_event_is_set(ctx, event: asyncio.Event) -> None:
+    if event.is_set():
+        return
+    async with ctx.typing():
+        await event.wait()
+
+
+#
+# Command hooks that hold a command back until the data it uses has
+# loaded. Commands that don't use bot data don't wait at all.
+#
+async def wait_for_main_bot_data(ctx) -> None:
+    await wait_until_ready_event_is_set(ctx, main_bot_data_ready)
+
+
+async def wait_for_main_bot_data_and_word_list(ctx) -> None:
+    await wait_until_ready_event_is_set(ctx, main_bot_data_ready)
+    await wait_until_ready_event_is_set(ctx, word_list_ready)
+
 
-    # Load Wordle Words
+class CustomBot(commands.Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http_session = None
+        self.autosave_task = None
+        self.game_sweep_task = None
+        self.startup_tasks = []
+
+    #
+    # Loading data starts before logging in, so it overlaps
+    # with the login and with connecting to the gateway.
+    #
+    async def login(self, token: str) -> None:
+        if len(self.startup_tasks) == 0:
+            self.startup_tasks.append(asyncio.create_task(load_main_bot_data_in_background()))
+            self.startup_tasks.append(asyncio.create_task(load_word_list_in_background()))
+
+        startup_timer.begin("login")
+        await super().login(token)
+        startup_timer.end("login")
+
+    async def setup_hook(self):
+        self.get_http_session()
+
+        if RESPONSE_CACHE_FILE != "":
+            await asyncio.to_thread(response_cache.load, RESPONSE_CACHE_FILE)
+
+        for pool in image_prefetch_pools.values():
+            pool.start()
+
+    #
+    # Returns the shared session used for outbound API requests,
+    # creating it if it doesn't exist yet. Connections are pooled
+    # and kept alive between commands.
+    #
+    def get_http_session(self) -> aiohttp.ClientSession:
+        if self.http_session is None or self.http_session.closed:
+            connector = aiohttp.TCPConnector(limit = HTTP_MAX_CONNECTIONS,
+                                             limit_per_host = HTTP_MAX_CONNECTIONS_PER_HOST,
+                                             keepalive_timeout = HTTP_KEEPALIVE_SECONDS)
+            timeout = aiohttp.ClientTimeout(total = HTTP_TOTAL_TIMEOUT_SECONDS,
+                                            sock_connect = HTTP_CONNECT_TIMEOUT_SECONDS,
+                                            sock_read = HTTP_READ_TIMEOUT_SECONDS)
+            self.http_session = aiohttp.ClientSession(connector = connector, timeout = timeout)
+        return self.http_session
+
+    async def close(self):
+        log("Cleaning up...")
+
+        if self.autosave_task is not None:
+            self.autosave_task.cancel()
+
+        if self.game_sweep_task is not None:
+            self.game_sweep_task.cancel()
+
+        if game_archive is not None:
+            try:
+                await asyncio.to_thread(game_archive.flush)
+            except OSError as error:
+                log(f"Failed to write to {GAME_ARCHIVE_FILE}: {error}")
+
+        # Bot data that never finished loading must not be saved over what's on disk
+        if main_bot_data_ready.is_set():
+            with main_bot_data.batch() as batch:
+                for key in debug_channel_dict.keys():
+                    batch.set(get_debug_channel_value_path(key), debug_channel_dict[key])
+
+            log("Saving data...")
+            await save_main_bot_data(backup = True)
+
+            # The save only removed the journal it rotated out. Changes made
+            # after its snapshot stay in the live journal and are replayed on
+            # the next start, so the live journal is never cleared here.
+            if main_data_journal is not None:
+                await asyncio.to_thread(main_data_journal.stop)
+
+        log("Shutting down...")
+        await super().close()
+
+        for pool in image_prefetch_pools.values():
+            await pool.stop()
+
+        for guard in endpoint_guards.values():
+            await guard.stop()
+
+        if RESPONSE_CACHE_FILE != "":
+            await asyncio.to_thread(response_cache.save, RESPONSE_CACHE_FILE)
+
+        if self.http_session is not None:
+            await self.http_session.close()
+
+        # Drain queued log lines so nothing is lost on shutdown
+        await asyncio.to_thread(log_writer.stop)
+
+
+bot = CustomBot(command_prefix = COMMAND_PREFIX, intents = intents)
+
+
+#
+# UTIL
+#
+
+
+#
+# The path helpers return compiled `KeyPath`s and remember recently
+# used ones, so checking the same user's permissions again doesn't
+# build or split any strings. They format like the dotted key.
+#
+
+
+@functools.lru_cache(maxsize = KEY_PATH_CACHE_SIZE)
+def get_server_data_path_prefix(server_id: int) -> KeyPath:
+    return KeyPath(f"servers.{server_id}")
+
+
+@functools.lru_cache(maxsize = KEY_PATH_CACHE_SIZE)
+def get_server_user_permissions_data_path_prefix(server_id: int, user_id: int) -> KeyPath:
+    return KeyPath(f"servers.{server_id}.users.{user_id}.permissions")
+
+
+def get_quiz_data_path_prefix(server_id: int, quiz_name: str) -> KeyPath:
+    return get_server_data_path_prefix(server_id).join("quizzes", quiz_name)
+
+
+def is_valid_quiz_name(name: str):
+    if QUIZ_VALID_NAME_REGEX.fullmatch(name) is not None:
+        return True
+    return False
+
+
+def get_user_data_path_prefix(user_id: int) -> KeyPath:
+    return compile_key_path(f"users.{user_id}")
+
+
+def roll_die(sides: int):
+    return random.choice(range(1, sides + 1))
+
+
+def roll_dice(num_dice: int, sides: int):
+    total = 0
+    for x in range(1, num_dice + 1):
+        total += roll_die(sides)
+    return total
+
+
+def random_error_message():
+    return random.choice(ERROR_MESSAGES)
+
+
+def mock_word(word: str) -> str:
+    if len(word) < 1:
+        return word
+
+    if len(word) == 1:
+        return word.upper()
+
+    lettercount = 0
+    can_cap = []
+    for i in range(0, len(word)):
+        char = word[i]
+        if char.isalpha():
+            lettercount += 1
+            can_cap.append(i)
+
+    num_to_capitalize = int(float(lettercount) * (67/100))
+    word = word.lower()
+
+    which_to_capitalize = []
+    for j in range(num_to_capitalize):
+        i = random.choice(range(0, len(can_cap)))
+        which_to_capitalize.append(can_cap[i])
+        can_cap.remove(can_cap[i])
+
+    to_ret = ""
+    for i in range(0, len(word)):
+        char = word[i]
+        if i in which_to_capitalize:
+            char = char.upper()
+        to_ret += char
+    return to_ret
+
+
+def mock_string(message: str) -> str:
+    words = message.split(" ")
+    new_words = []
+    for word in words:
+        new_words.append(mock_word(word))
+    return " ".join(new_words)
+
+
+register_debug_channel("http")
+
+
+#
+# Performs a GET fetch and returns the JSON response
+# when the GET was successful. Otherwise, returns `None`
+#
+async def http_fetch_json(url: str):
+    debug_lazy("http", "JSON GET {}", url)
+    session = bot.get_http_session()
+
+    try:
+        async with session.get(url) as response:
+            if response.status != 200 and response.status != 201:
+                log(f"Request to '{url}' returned status code {response.status}")
+                return None
+
+            try:
+                response_json = await response.json(content_type = None)
+            except ValueError:
+                log(f"Request to '{url}' returned bad JSON")
+                return None
+    except asyncio.TimeoutError:
+        log(f"Request to '{url}' timed out")
+        return None
+    except aiohttp.ClientError as error:
+        log(f"Request to '{url}' failed: {error}")
+        return None
+
+    return response_json
+
+
+#
+# Shares one in-flight request between concurrent callers of the same URL
+# ("single-flight"), for the URLs it's enabled for. The first caller
+# starts the request, and everyone who asks for that URL before it
+# finishes waits on the same result instead of starting their own.
+#
+# Callers share the returned object, so they must not modify it.
+#
+class RequestCoalescer(object):
+    def __init__(self):
+        self.enabled_urls = set()
+        self.in_flight = {}
+        self.stats = {}
+
+    def configure_endpoint(self, url: str, enabled: bool) -> None:
+        if enabled is True:
+            self.enabled_urls.add(url)
+        else:
+            self.enabled_urls.discard(url)
+        self.stats.setdefault(url, {"upstream": 0, "saved": 0})
+
+    def is_enabled(self, url: str) -> bool:
+        return url in self.enabled_urls
+
+    async def fetch(self, url: str, fetch):
+        task = self.in_flight.get(url)
+        if task is None:
+            self.stats[url]["upstream"] += 1
+            task = asyncio.create_task(fetch(url))
+            self.in_flight[url] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(url, None))
+        else:
+            self.stats[url]["saved"] += 1
+            debug_lazy("http", "Joined in-flight request to {}", url)
+
+        # Shielded so one caller giving up doesn't cancel the request for the others
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+
+request_coalescer = RequestCoalescer()
+request_coalescer.configure_endpoint(JOKE_API_URL, JOKE_COALESCE_REQUESTS)
+request_coalescer.configure_endpoint(QUOTE_API_URL, QUOTE_COALESCE_REQUESTS)
+request_coalescer.configure_endpoint(NO_API_URL, NO_COALESCE_REQUESTS)
+request_coalescer.configure_endpoint(CAT_API_URL, IMAGE_COALESCE_REQUESTS)
+request_coalescer.configure_endpoint(DOG_API_URL, IMAGE_COALESCE_REQUESTS)
+request_coalescer.configure_endpoint(PENGUIN_API_URL, IMAGE_COALESCE_REQUESTS)
+
+
+class ApiUnavailableError(Exception):
+    pass
+
+
+#
+# Bounds how long a request to one API may take, and stops sending
+# requests to it for a while when it keeps failing.
+#
+# Every request gets `deadline` seconds. With `hedge` enabled, a second
+# request is sent when the first hasn't answered by the API's recent
+# p95 latency, and whichever answers first wins. The p95 is taken from
+# first requests only: a hedged win records how long the first request
+# had been waiting, and a missed deadline records the deadline, so
+# hedging doesn't pull its own trigger point down.
+#
+# After `failure_threshold` failures in a row the circuit breaker opens:
+# requests fail right away with `ApiUnavailableError`, and a background
+# task probes the API every `open_duration` seconds until a probe
+# succeeds and the breaker closes again.
+#
+class EndpointGuard(object):
+    STATE_CLOSED = "closed"
+    STATE_OPEN = "open"
+    STATE_PROBING = "probing"
+
+    LATENCY_SAMPLES = 100
+    MIN_HEDGE_SAMPLES = 20
+
+    def __init__(self, name: str, deadline: float, hedge: bool = False,
+                 failure_threshold: int = API_BREAKER_FAILURE_THRESHOLD,
+                 open_duration: float = API_BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.deadline = deadline
+        self.hedge = hedge
+        self.failure_threshold = failure_threshold
+        self.open_duration = open_duration
+
+        self.latencies = deque(maxlen = EndpointGuard.LATENCY_SAMPLES)
+        self.state = EndpointGuard.STATE_CLOSED
+        self.consecutive_failures = 0
+        self.probe_task = None
+
+        self.requests = 0
+        self.failures = 0
+        self.deadline_exceeded = 0
+        self.hedged = 0
+        self.rejected = 0
+
+    def get_p95_latency(self):
+        if len(self.latencies) < EndpointGuard.MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(len(ordered) * 0.95) - 1)]
+
+    async def fetch_primary(self, url: str, start: float):
+        result = await http_fetch_json(url)
+        if result is not None:
+            self.latencies.append(time.monotonic() - start)
+        return result
+
+    async def fetch_with_hedge(self, url: str):
+        start = time.monotonic()
+        primary = asyncio.create_task(self.fetch_primary(url, start))
+        tasks = {primary}
+
+        try:
+            hedge_delay = self.get_p95_latency() if self.hedge is True else None
+            if hedge_delay is not None:
+                done, pending = await asyncio.wait(tasks, timeout = hedge_delay)
+                if len(done) < 1:
+                    self.hedged += 1
+                    debug_lazy("http", "Hedging request to {} after {:.3f}s", url, hedge_delay)
+                    tasks.add(asyncio.create_task(http_fetch_json(url)))
+
+            result = None
+            while len(tasks) > 0 and result is None:
+                done, tasks = await asyncio.wait(tasks, return_when = asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if result is None:
+                        result = task.result()
+
+            # The hedge won, so the first request took at least this long
+            if result is not None and primary.done() is False:
+                self.latencies.append(time.monotonic() - start)
+            return result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fetch_within_deadline(self, url: str):
+        try:
+            return await asyncio.wait_for(self.fetch_with_hedge(url), timeout = self.deadline)
+        except asyncio.TimeoutError:
+            self.deadline_exceeded += 1
+            self.latencies.append(self.deadline)
+            log(f"Request to '{url}' missed its {self.deadline}s deadline")
+            return None
+
+    def record_result(self, url: str, result) -> None:
+        if result is not None:
+            self.consecutive_failures = 0
+            return
+
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == EndpointGuard.STATE_CLOSED and self.consecutive_failures >= self.failure_threshold:
+            log(f"Circuit breaker for {self.name} opened after {self.consecutive_failures} failures")
+            self.state = EndpointGuard.STATE_OPEN
+            self.probe_task = asyncio.create_task(self.probe(url))
+
+    async def probe(self, url: str) -> None:
+        while True:
+            await asyncio.sleep(self.open_duration)
+            self.state = EndpointGuard.STATE_PROBING
+            result = await self.fetch_within_deadline(url)
+            if result is not None:
+                log(f"Circuit breaker for {self.name} closed, the API is answering again")
+                self.state = EndpointGuard.STATE_CLOSED
+                self.consecutive_failures = 0
+                self.probe_task = None
+                return
+            self.state = EndpointGuard.STATE_OPEN
+
+    async def fetch(self, url: str):
+        if self.state != EndpointGuard.STATE_CLOSED:
+            self.rejected += 1
+            raise ApiUnavailableError(f"Sorry, {self.name} isn't answering right now. Try again in a bit!")
+
+        self.requests += 1
+        result = await self.fetch_within_deadline(url)
+        self.record_result(url, result)
+        return result
+
+    async def stop(self) -> None:
+        if self.probe_task is None:
+            return
+        self.probe_task.cancel()
+        try:
+            await self.probe_task
+        except asyncio.CancelledError:
+            pass
+        self.probe_task = None
+
+    def get_stats(self) -> dict:
+        p95 = self.get_p95_latency()
+        return {
+            "state": self.state,
+            "deadline": self.deadline,
+            "hedge": self.hedge,
+            "p95": "n/a" if p95 is None else f"{p95:.3f}s",
+            "requests": self.requests,
+            "failures": self.failures,
+            "deadline_exceeded": self.deadline_exceeded,
+            "hedged": self.hedged,
+            "rejected": self.rejected,
+        }
+
+
+endpoint_guards = {
+    JOKE_API_URL: EndpointGuard("the joke API", API_DEADLINE_SECONDS, hedge = API_HEDGE_REQUESTS),
+    QUOTE_API_URL: EndpointGuard("the quote API", API_DEADLINE_SECONDS, hedge = API_HEDGE_REQUESTS),
+    NO_API_URL: EndpointGuard("the no API", API_DEADLINE_SECONDS, hedge = API_HEDGE_REQUESTS),
+    CAT_API_URL: EndpointGuard("the cat API", IMAGE_API_DEADLINE_SECONDS, hedge = IMAGE_API_HEDGE_REQUESTS),
+    DOG_API_URL: EndpointGuard("the dog API", IMAGE_API_DEADLINE_SECONDS, hedge = IMAGE_API_HEDGE_REQUESTS),
+    PENGUIN_API_URL: EndpointGuard("the penguin API", IMAGE_API_DEADLINE_SECONDS, hedge = IMAGE_API_HEDGE_REQUESTS),
+}
+
+
+async def guarded_http_fetch_json(url: str):
+    guard = endpoint_guards.get(url)
+    if guard is None:
+        return await http_fetch_json(url)
+    return await guard.fetch(url)
+
+
+async def http_get_json_generic(url: str):
+    if request_coalescer.is_enabled(url) is True:
+        return await request_coalescer.fetch(url, guarded_http_fetch_json)
+    return await guarded_http_fetch_json(url)
+
+
+#
+# A cache in front of `http_get_json_generic()` for APIs that return
+# a random item on every call (jokes, quotes, ...).
+#
+# Each configured URL keeps a pool of recently fetched responses.
+# While the newest response is younger than the URL's TTL, requests are
+# served from the pool. Once it is older, the request is still served
+# from the pool right away ("stale"), and a new response is fetched in
+# the background to add to it, so users never wait on a refresh.
+# Only an empty pool makes the caller wait for the API.
+#
+# Responses that have not been served yet are preferred, so users
+# mostly see new items while the pool still covers API outages.
+#
+class ResponseCache(object):
+    def __init__(self, max_stale: float = 86400):
+        self.max_stale = max_stale
+        self.endpoints = {}
+        self.pools = {}
+        self.refresh_tasks = {}
+        self.stats = {}
+
+    def configure_endpoint(self, url: str, ttl: float, pool_size: int) -> None:
+        self.endpoints[url] = (ttl, pool_size)
+        self.pools.setdefault(url, deque(maxlen = pool_size))
+        self.stats.setdefault(url, {"hits": 0, "stale": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0})
+
+    def is_cached_endpoint(self, url: str) -> bool:
+        return url in self.endpoints
+
+    def add_response(self, url: str, response, fetched_at: float = None) -> None:
+        if fetched_at is None:
+            fetched_at = time.time()
+        # [fetched_at, response, served]
+        self.pools[url].append([fetched_at, response, False])
+
+    def drop_too_stale(self, url: str) -> None:
+        pool = self.pools[url]
+        now = time.time()
+        while len(pool) > 0 and now - pool[0][0] > self.max_stale:
+            pool.popleft()
+
+    def pick_response(self, url: str):
+        pool = self.pools[url]
+        for entry in reversed(pool):
+            if entry[2] is False:
+                entry[2] = True
+                return entry[1]
+        return random.choice(pool)[1]
+
+    def on_refresh_done(self, url: str, task: asyncio.Task) -> None:
+        if self.refresh_tasks.get(url) is task:
+            del self.refresh_tasks[url]
+        if task.cancelled():
+            return
+        error = task.exception()
+        if isinstance(error, ApiUnavailableError):
+            self.stats[url]["refresh_failures"] += 1
+        elif error is not None:
+            log(f"Refreshing the response cache for {url} failed: {error}")
+
+    #
+    # Returns the running refresh of `url`, starting one if there isn't one.
+    # Everyone who needs a new response shares it, so it's only pooled once.
+    #
+    def start_refresh(self, url: str) -> asyncio.Task:
+        task = self.refresh_tasks.get(url)
+        if task is not None:
+            return task
+        task = asyncio.create_task(self.refresh(url))
+        self.refresh_tasks[url] = task
+        task.add_done_callback(functools.partial(self.on_refresh_done, url))
+        return task
+
+    # Error bodies (such as the joke API's `{"error": true, ...}`) must not be served again
+    @staticmethod
+    def is_error_response(response) -> bool:
+        return isinstance(response, dict) and response.get("error") is True
+
+    async def refresh(self, url: str):
+        self.stats[url]["refreshes"] += 1
+        response = await http_get_json_generic(url)
+        if response is None or ResponseCache.is_error_response(response) is True:
+            self.stats[url]["refresh_failures"] += 1
+            return None
+        self.add_response(url, response)
+        return response
+
+    async def get(self, url: str):
+        if self.is_cached_endpoint(url) is False:
+            return await http_get_json_generic(url)
+
+        ttl, pool_size = self.endpoints[url]
+        self.drop_too_stale(url)
+        pool = self.pools[url]
+
+        if len(pool) < 1:
+            self.stats[url]["misses"] += 1
+            # Shielded, so one caller giving up doesn't cancel it for the others
+            response = await asyncio.shield(self.start_refresh(url))
+            if response is not None:
+                for entry in pool:
+                    if entry[1] is response:
+                        entry[2] = True
+            return response
+
+        if time.time() - pool[-1][0] < ttl:
+            self.stats[url]["hits"] += 1
+        else:
+            self.stats[url]["stale"] += 1
+            self.start_refresh(url)
+
+        return self.pick_response(url)
+
+    def get_stats(self) -> dict:
+        stats = {}
+        for url in self.endpoints.keys():
+            stats[url] = dict(self.stats[url], pooled = len(self.pools[url]))
+        return stats
+
+    # A saved entry is [fetched_at, response]
+    @staticmethod
+    def is_valid_saved_entry(entry) -> bool:
+        if isinstance(entry, list) is False or len(entry) != 2:
+            return False
+        if isinstance(entry[0], (int, float)) is False:
+            return False
+        return ResponseCache.is_error_response(entry[1]) is False
+
+    def load(self, file_name: str) -> None:
+        if os.path.exists(file_name) is False:
+            return
+        try:
+            with open(file_name, 'r') as file:
+                saved = json.load(file)
+        except (OSError, ValueError) as error:
+            log(f"Failed to load response cache {file_name}: {error}")
+            return
+
+        # The file may have been cut short or edited by hand
+        if isinstance(saved, dict) is False:
+            log(f"Ignoring response cache {file_name}: expected an object of URLs")
+            return
+
+        for url, entries in saved.items():
+            if self.is_cached_endpoint(url) is False:
+                continue
+            if isinstance(entries, list) is False:
+                log(f"Ignoring cached responses for {url}: expected a list")
+                continue
+            skipped = 0
+            for entry in entries:
+                if ResponseCache.is_valid_saved_entry(entry) is False:
+                    skipped += 1
+                    continue
+                self.add_response(url, entry[1], entry[0])
+            if skipped > 0:
+                log(f"Skipped {skipped} unreadable cached responses for {url}")
+            self.drop_too_stale(url)
+        debug("response_cache", f"Loaded response cache from {file_name}")
+
+    def save(self, file_name: str) -> None:
+        saved = {}
+        for url, pool in self.pools.items():
+            saved[url] = [[entry[0], entry[1]] for entry in pool]
+        try:
+            with open(file_name, 'w') as file:
+                json.dump(saved, file)
+        except OSError as error:
+            log(f"Failed to save response cache {file_name}: {error}")
+
+
+response_cache = ResponseCache(max_stale = RESPONSE_CACHE_MAX_STALE_SECONDS)
+response_cache.configure_endpoint(JOKE_API_URL, JOKE_CACHE_TTL_SECONDS, RESPONSE_CACHE_POOL_SIZE)
+response_cache.configure_endpoint(QUOTE_API_URL, QUOTE_CACHE_TTL_SECONDS, RESPONSE_CACHE_POOL_SIZE)
+response_cache.configure_endpoint(NO_API_URL, NO_CACHE_TTL_SECONDS, RESPONSE_CACHE_POOL_SIZE)
+
+
+async def get_random_no():
+    response_json = await response_cache.get(NO_API_URL)
+    if response_json is None:
+        return None
+
+    reason = response_json["reason"]
+    if reason is None:
+        raise ValueError("'reason' is not set")
+
+    return reason
+
+
+async def get_random_kitty_image():
+    response_json = await http_get_json_generic(CAT_API_URL)
+    if response_json is None:
+        return None
+
+    item = response_json[0]
+    if item is None:
+        raise ValueError("'item' is not set")
+
+    url = item["url"]
+    if url is None:
+        raise ValueError("'url' is not set")
+
+    return {"url": url}
+
+
+async def get_random_doggo_image():
+    response_json = await http_get_json_generic(DOG_API_URL)
+    if response_json is None:
+        return None
+
+    item = response_json[0]
+    if item is None:
+        raise ValueError("'item' is not set")
+
+    url = item["url"]
+    if url is None:
+        raise ValueError("'url' is not set")
+
+    return {"url": url}
+
+
+async def get_random_penguin_image():
+    item = await http_get_json_generic(PENGUIN_API_URL)
+    if item is None:
+        return None
+
+    url = item["img"]
+    species = item["species"]
+
+    if url is None:
+        raise ValueError("'url' is not set")
+    if species is None:
+        raise ValueError("'species' is not set")
+
+    return {"url": url, "species": species}
+
+
+#
+# Keeps up to `depth` image records fetched ahead of time, so that
+# commands can send an image without waiting on the API.
+#
+# A background task refills the buffer with up to `concurrency`
+# fetches at a time whenever it drops below `depth`. Records older
+# than `max_age` seconds are thrown away instead of being served,
+# and `take()` falls back to a live fetch when nothing is buffered.
+#
+# The task also wakes up on its own when the oldest record is about to
+# expire and fetches its replacement, so the buffer stays warm through
+# idle periods. Old records keep being served until the new ones arrive.
+#
+class ImagePrefetchPool(object):
+    RETRY_DELAY_SECONDS = 5
+    MAX_RETRY_DELAY_SECONDS = 300
+    REFRESH_AGE_FRACTION = 0.8
+
+    def __init__(self, name: str, fetch, depth: int = 5, concurrency: int = 2, max_age: float = 1800):
+        self.name = name
+        self.fetch = fetch
+        self.depth = depth
+        self.concurrency = max(1, concurrency)
+        self.max_age = max_age
+        self.refresh_age = max_age * ImagePrefetchPool.REFRESH_AGE_FRACTION
+
+        self.records = deque()
+        self.refill_needed = asyncio.Event()
+        self.task = None
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.refreshed = 0
+        self.refill_failures = 0
+
+    def start(self) -> None:
+        if self.depth < 1 or self.task is not None:
+            return
+        self.refill_needed.set()
+        self.task = asyncio.create_task(self.run(), name = f"prefetch-{self.name}")
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def drop_expired(self) -> None:
+        now = time.monotonic()
+        while len(self.records) > 0 and now - self.records[0][0] > self.max_age:
+            self.records.popleft()
+            self.expired += 1
+
+    # Records that are still fresh enough to skip refreshing
+    def get_fresh_count(self, now: float) -> int:
+        return sum(1 for fetched_at, record in self.records if now - fetched_at <= self.refresh_age)
+
+    # Seconds until the oldest record should be refreshed, or `None` when there's nothing to refresh
+    def get_refresh_delay(self):
+        if len(self.records) < 1:
+            return None
+        return max(0.0, self.records[0][0] + self.refresh_age - time.monotonic())
+
+    async def wait_for_refill(self) -> None:
+        try:
+            await asyncio.wait_for(self.refill_needed.wait(), timeout = self.get_refresh_delay())
+        except asyncio.TimeoutError:
+            pass
+
+    async def fetch_one(self):
+        try:
+            return await self.fetch()
+        except Exception as error:
+            log(f"Prefetch '{self.name}' failed: {error}")
+            return None
+
+    async def run(self) -> None:
+        retry_delay = ImagePrefetchPool.RETRY_DELAY_SECONDS
+
+        while True:
+            await self.wait_for_refill()
+            self.refill_needed.clear()
+            self.drop_expired()
+
+            while self.get_fresh_count(time.monotonic()) < self.depth:
+                count = min(self.concurrency, self.depth - self.get_fresh_count(time.monotonic()))
+                results = await asyncio.gather(*[self.fetch_one() for _ in range(count)])
+
+                fetched_at = time.monotonic()
+                failed = 0
+                for record in results:
+                    if record is None:
+                        failed += 1
+                    else:
+                        self.records.append((fetched_at, record))
+
+                if failed > 0:
+                    self.refill_failures += failed
+                    debug_lazy("prefetch", "'{}' failed {} fetches, retrying in {}s", self.name, failed, retry_delay)
+                    await asyncio.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, ImagePrefetchPool.MAX_RETRY_DELAY_SECONDS)
+                else:
+                    retry_delay = ImagePrefetchPool.RETRY_DELAY_SECONDS
+
+            # The replacements are in, so drop the records they replace
+            while len(self.records) > self.depth:
+                self.records.popleft()
+                self.refreshed += 1
+
+    async def take(self):
+        self.drop_expired()
+        self.refill_needed.set()
+
+        if len(self.records) > 0:
+            self.hits += 1
+            fetched_at, record = self.records.popleft()
+            return record
+
+        self.misses += 1
+        return await self.fetch()
+
+    def get_stats(self) -> dict:
+        return {
+            "buffered": len(self.records),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "refreshed": self.refreshed,
+            "refill_failures": self.refill_failures,
+        }
+
+
+register_debug_channel("prefetch")
+
+image_prefetch_pools = {
+    "kitty": ImagePrefetchPool("kitty", get_random_kitty_image, depth = IMAGE_PREFETCH_DEPTH,
+                               concurrency = IMAGE_PREFETCH_CONCURRENCY, max_age = IMAGE_PREFETCH_MAX_AGE_SECONDS),
+    "doggo": ImagePrefetchPool("doggo", get_random_doggo_image, depth = IMAGE_PREFETCH_DEPTH,
+                               concurrency = IMAGE_PREFETCH_CONCURRENCY, max_age = IMAGE_PREFETCH_MAX_AGE_SECONDS),
+    "penguin": ImagePrefetchPool("penguin", get_random_penguin_image, depth = IMAGE_PREFETCH_DEPTH,
+                                 concurrency = IMAGE_PREFETCH_CONCURRENCY, max_age = IMAGE_PREFETCH_MAX_AGE_SECONDS),
+}
+
+
+def status_str_to_discord_status(status: str):
+    if status == "online":
+        discord_status = discord.Status.online
+    elif status == "idle":
+        discord_status = discord.Status.idle
+    elif status == "dnd":
+        discord_status = discord.Status.do_not_disturb
+    elif status == "invisible":
+        discord_status = discord.Status.invisible
+    else:
+        discord_status = None
+    return discord_status
+
+
+async def update_presence(status: discord.Status | None, message: str | None):
+    if status is None:
+        status = discord.Status.online
+
+    if message is None:
+        await bot.change_presence(status = status)
+    else:
+        game = discord.Game(message)
+        await bot.change_presence(status = status, activity = game)
+
+
+register_debug_channel("permission")
+
+
+#
+# Answers permission checks from a cache of each user's granted
+# permissions in each server, kept as a bitmask. Only the permissions
+# in `PERMISSIONS` have bits; other names found in the data are ignored,
+# so stored data can't grow the table. Cached users are dropped when
+# their permissions change, through the bot data's change listener.
+#
+class PermissionEngine(object):
+    # Having it in a server grants every other permission there
+    ADMIN_PERMISSION = "is_admin"
+    # Every permission the bot checks
+    PERMISSIONS = (ADMIN_PERMISSION, "quiz_create")
+
+    def __init__(self, admin_user_ids, admin_usernames, cache_size: int = 10000):
+        self.lock = threading.Lock()
+        self.bot_admin_ids = frozenset(admin_user_ids)
+        self.bot_admin_names = frozenset(admin_usernames)
+
+        # Permission name -> bit
+        self.bits = {permission: 1 << index for index, permission in enumerate(PermissionEngine.PERMISSIONS)}
+        self.admin_bit = self.bits[PermissionEngine.ADMIN_PERMISSION]
+
+        # (server id, user id), as strings like in the data -> granted bits
+        self.cache = OrderedDict()
+        self.cache_size = max(1, cache_size)
+        # Changes whenever something is invalidated, so a lookup that
+        # raced with a change doesn't cache what it read before it
+        self.generation = 0
+        self.dictionary = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def attach(self, dictionary) -> None:
+        with self.lock:
+            self.dictionary = dictionary
+            self.cache.clear()
+            self.generation += 1
+        dictionary.add_change_listener(self.on_data_changed)
+
+    def is_bot_admin(self, user) -> bool:
+        return user.id in self.bot_admin_ids or user.name in self.bot_admin_names
+
+    def get_bit(self, permission: str) -> int:
+        bit = self.bits.get(permission)
+        if bit is not None:
+            return bit
+        if PERMISSION_VALID_NAME_REGEX.fullmatch(permission) is None:
+            raise ValueError(f"Permission does not match regex {PERMISSION_VALID_NAME_PATTERN}")
+        raise ValueError(f"Unknown permission '{permission}'")
+
+    def resolve_mask(self, permissions) -> int:
+        mask = 0
+        if isinstance(permissions, dict):
+            for permission, value in permissions.items():
+                bit = self.bits.get(permission)
+                if value is True and bit is not None:
+                    mask |= bit
+        return mask
+
+    def get_mask(self, server_id: int, user_id: int) -> int:
+        cache_key = (str(server_id), str(user_id))
+        with self.lock:
+            mask = self.cache.get(cache_key)
+            if mask is not None:
+                self.cache.move_to_end(cache_key)
+                self.hits += 1
+                return mask
+            self.misses += 1
+            generation = self.generation
+
+        permissions = self.dictionary.dictionary_get_copy(get_server_user_permissions_data_path_prefix(server_id, user_id))
+        mask = self.resolve_mask(permissions)
+
+        with self.lock:
+            if self.generation == generation:
+                self.cache[cache_key] = mask
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last = False)
+        return mask
+
+    def on_data_changed(self, key_path: KeyPath | None) -> None:
+        if key_path is not None:
+            parts = key_path.parts
+            if parts[0] != "servers":
+                return
+            if len(parts) >= 3 and parts[2] != "users":
+                return
+            if len(parts) >= 4:
+                with self.lock:
+                    self.generation += 1
+                    self.invalidations += 1
+                    self.cache.pop((parts[1], parts[3]), None)
+                return
+
+        with self.lock:
+            self.generation += 1
+            self.invalidations += 1
+            self.cache.clear()
+
+    def has_permission(self, server_id: int, user_id: int, permission: str) -> bool:
+        bit = self.get_bit(permission)
+        return self.get_mask(server_id, user_id) & (self.admin_bit | bit) != 0
+
+    def is_server_admin(self, server_id: int, user_id: int) -> bool:
+        return self.get_mask(server_id, user_id) & self.admin_bit != 0
+
+    # Permission name -> whether the user has it
+    def check_permissions(self, server_id: int, user_id: int, permissions: list) -> dict:
+        bits = [(permission, self.get_bit(permission)) for permission in permissions]
+        mask = self.get_mask(server_id, user_id)
+        if mask & self.admin_bit != 0:
+            return {permission: True for permission, _ in bits}
+        return {permission: mask & bit != 0 for permission, bit in bits}
+
+    # User ID -> whether that user has the permission
+    def check_users(self, server_id: int, user_ids: list, permission: str) -> dict:
+        bits = self.admin_bit | self.get_bit(permission)
+        return {user_id: self.get_mask(server_id, user_id) & bits != 0 for user_id in user_ids}
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                "cached_users": len(self.cache),
+                "max_cached_users": self.cache_size,
+                "permissions": len(self.bits),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+def parse_admin_user_ids(value: str) -> list[int]:
+    user_ids = []
+    for user_id in value.split(","):
+        user_id = user_id.strip()
+        if user_id != "":
+            user_ids.append(int(user_id))
+    return user_ids
+
+
+permission_engine = PermissionEngine(parse_admin_user_ids(ADMIN_USER_IDS),
+                                     [name.strip() for name in ADMIN_USERNAMES.split(",") if name.strip() != ""],
+                                     cache_size = PERMISSION_CACHE_SIZE)
+
+
+def is_admin_user(user):
+    return permission_engine.is_bot_admin(user)
+
+
+def user_is_bot_admin_in_server(user_id: int, server_id: int):
+    result = permission_engine.is_server_admin(server_id, user_id)
+    debug_lazy("permission", "User {} is a bot admin in server {}: {}", user_id, server_id, result)
+    return result
+
+
+def user_has_permission_in_server(user_id: int, server_id: int, permission: str):
+    # Bot admins in the server automatically have permission to do *anything*
+    result = permission_engine.has_permission(server_id, user_id, permission)
+    debug_lazy("permission", "User {} has permission '{}' in server {}: {}", user_id, permission, server_id, result)
+    return result
+
+
+async def send_dm_to_user(user: discord.User, message: str = None, embed: discord.Embed = None, silent: bool = False):
+    details_list = []
+
+    if message is not None:
+        details_list.append(f"Message: `{message}`")
+
+    if embed is not None:
+        details_list.append("Has Embed")
+
+    if silent is True:
+        details_list.append("Is Silent")
+    else:
+        details_list.append("Is Not Silent")
+
+    details = ", ".join(details_list)
+
+    debug("DM", f"Sending DM to {user.name}. {details}")
+    await user.create_dm()
+    await user.send(message, embed = embed, silent = silent)
+
+
+async def send_dm_to_user_by_id(user_id: int, message: str = None, embed: discord.Embed = None, silent: bool = False):
+    user = await bot.fetch_user(user_id)
+    await send_dm_to_user(user, message, embed = embed, silent = silent)
+
+
+#
+# On Connect
+#
 
-    if WORDLE_WORDS_FILE is not None and WORDLE_WORDS_FILE != "":
-        words_from_file = load_file_lines(WORDLE_WORDS_FILE)
-        for word in words_from_file:
-            wordle_words.append(word.rstrip())
 
-    # Done! Set Status
+@bot.event
+async def on_ready():
+    # Bot data and the word list are loaded in the background, see `CustomBot.login()`
+    startup_timer.end("ready")
 
     log(f"Logged in as {bot.user}!")
     debug("startup", f"Logged in as {bot.user}")
@@ -612,6 +4184,11 @@ async def on_command_error(ctx: discord.ext.commands.Context, error: discord.ext
     if not isinstance(error, commands.CommandError):
         raise ValueError("error is not a CommandError")
 
+    # An API we depend on is down, no need for the full error trace
+    if isinstance(error.__cause__, ApiUnavailableError):
+        await ctx.reply(str(error.__cause__))
+        return
+
     suberror_causes = []
     suberror = error
 
@@ -760,6 +4337,7 @@ async def plaque_command(ctx):
 
 
 @bot.command(name = "debug", help = "(Admin-only) Enable/Disable specific debug channels", hidden = True)
+@commands.before_invoke(wait_for_main_bot_data)
 async def debug_command(ctx, name: str, value: bool):
     if is_admin_user(ctx.author) is False:
         await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
@@ -779,6 +4357,7 @@ async def debug_command(ctx, name: str, value: bool):
 
 
 @bot.command(name = "debugged", help = "(Admin-only) Show debug channel values", hidden = True)
+@commands.before_invoke(wait_for_main_bot_data)
 async def debugged_command(ctx):
     if is_admin_user(ctx.author) is False:
         await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
@@ -802,6 +4381,253 @@ async def debugged_command(ctx):
     await ctx.reply(f"```{string_to_send}```")
 
 
+@bot.command(name = "log_stats", help = "(Admin-only) Show log writer statistics", hidden = True)
+async def log_stats_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    stats = log_writer.get_stats()
+    lines = []
+    for key in stats.keys():
+        lines.append(f"{key} = {stats[key]}")
+
+    await ctx.reply(f"```{', '.join(lines)}```")
+
+
+@bot.command(name = "prefetch_stats", help = "(Admin-only) Show image prefetch buffer statistics", hidden = True)
+async def prefetch_stats_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    lines = []
+    for name, pool in image_prefetch_pools.items():
+        stats = pool.get_stats()
+        values = ", ".join([f"{key} = {stats[key]}" for key in stats.keys()])
+        lines.append(f"{name}: {values}")
+
+    string_to_send = "\n".join(lines)
+    await ctx.reply(f"```{string_to_send}```")
+
+
+@bot.command(name = "cache_stats", help = "(Admin-only) Show API response cache statistics", hidden = True)
+async def cache_stats_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    lines = []
+    stats = response_cache.get_stats()
+    for url, url_stats in stats.items():
+        values = ", ".join([f"{key} = {url_stats[key]}" for key in url_stats.keys()])
+        lines.append(f"{url}\n  {values}")
+
+    string_to_send = "\n".join(lines)
+    await ctx.reply(f"```{string_to_send}```")
+
+
+@bot.command(name = "coalesce_stats", help = "(Admin-only) Show how many API requests were shared between callers", hidden = True)
+async def coalesce_stats_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    lines = []
+    stats = request_coalescer.get_stats()
+    for url, url_stats in stats.items():
+        enabled = request_coalescer.is_enabled(url)
+        lines.append(f"{url}\n  enabled = {enabled}, upstream = {url_stats['upstream']}, saved = {url_stats['saved']}")
+
+    string_to_send = "\n".join(lines)
+    await ctx.reply(f"```{string_to_send}```")
+
+
+@bot.command(name = "api_status", help = "(Admin-only) Show deadlines, latency and circuit breaker state of external APIs", hidden = True)
+async def api_status_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    lines = []
+    for guard in endpoint_guards.values():
+        stats = guard.get_stats()
+        values = ", ".join([f"{key} = {stats[key]}" for key in stats.keys()])
+        lines.append(f"{guard.name}\n  {values}")
+
+    string_to_send = "\n".join(lines)
+    await ctx.reply(f"```{string_to_send}```")
+
+
+@bot.command(name = "data_stats", help = "(Admin-only) Show bot data storage statistics", hidden = True)
+@commands.before_invoke(wait_for_main_bot_data)
+async def data_stats_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    lines = []
+    if DATA_BACKEND == "sqlite":
+        stats = main_bot_data.get_stats()
+        lines.append("sqlite: " + ", ".join([f"{key} = {stats[key]}" for key in stats.keys()]))
+    if main_data_journal is not None:
+        stats = main_data_journal.get_stats()
+        lines.append("journal: " + ", ".join([f"{key} = {stats[key]}" for key in stats.keys()]))
+    if DATA_BACKEND == "json" and main_bot_data.shards is not None:
+        stats = main_bot_data.shards.get_stats()
+        lines.append("shards: " + ", ".join([f"{key} = {stats[key]}" for key in stats.keys()]))
+    if len(lines) < 1:
+        lines.append("No journal or shards in use")
+
+    string_to_send = "\n".join(lines)
+    await ctx.reply(f"```{string_to_send}```")
+
+
+@bot.command(name = "permission_stats", help = "(Admin-only) Show permission cache statistics", hidden = True)
+async def permission_stats_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    stats = permission_engine.get_stats()
+    lines = [f"{key} = {stats[key]}" for key in stats.keys()]
+    string_to_send = "\n".join(lines)
+    await ctx.reply(f"```{string_to_send}```")
+
+
+@bot.command(name = "words_reload", help = "(Admin-only) Reload the word list used by games", hidden = True)
+@commands.before_invoke(wait_for_main_bot_data_and_word_list)
+async def words_reload_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    if WORDLE_WORDS_FILE is None or WORDLE_WORDS_FILE == "":
+        await ctx.reply("There's no `WORDLE_WORDS_FILE` set to load words from.")
+        return
+
+    async with ctx.typing():
+        try:
+            dictionary = await reload_word_dictionary()
+        except (OSError, ValueError) as error:
+            log(f"Failed to reload {WORDLE_WORDS_FILE}: {error}")
+            await ctx.reply(f"Couldn't read `{WORDLE_WORDS_FILE}`, still using the old word list.")
+            return
+
+    stats = dictionary.get_stats()
+    log(f"Reloaded word dictionary: {stats}")
+    lines = [f"{key} = {stats[key]}" for key in stats.keys()]
+    string_to_send = "\n".join(lines)
+    await ctx.reply(f"```{string_to_send}```")
+
+
+@bot.command(name = "data_convert", help = "(Admin-only) Convert bot data files to another format", hidden = True)
+@commands.before_invoke(wait_for_main_bot_data)
+async def data_convert_command(ctx, file_format: str):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    if DATA_BACKEND != "json":
+        await ctx.reply("Data files are only used with the `json` backend.")
+        return
+
+    try:
+        serializer = get_data_serializer(file_format)
+    except ValueError as error:
+        await ctx.reply(str(error))
+        return
+
+    async with ctx.typing():
+        await save_main_bot_data()
+        async with data_lock:
+            count = await asyncio.to_thread(convert_main_bot_data, serializer)
+
+    log(f"Converted {count} data files to {serializer.name}")
+    await ctx.reply(f"Converted {count} files to `{serializer.name}`. Set `DATA_FILE_FORMAT` in `.env` to keep using it after a restart.")
+
+
+@bot.command(name = "data_compact", help = "(Admin-only) Remove empty entries from bot data", hidden = True)
+@commands.before_invoke(wait_for_main_bot_data)
+async def data_compact_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    if DATA_BACKEND != "json":
+        await ctx.reply("The `sqlite` backend never stores empty entries.")
+        return
+
+    async with ctx.typing():
+        await save_main_bot_data()
+        async with data_lock:
+            result = await asyncio.to_thread(compact_main_bot_data)
+
+    lines = [
+        f"Removed {result['memory_nodes']} empty entries from memory (~{result['memory_bytes'] / 1024:.1f} KiB)",
+        f"Removed {result['file_nodes']} empty entries from shard files that weren't loaded",
+        f"Data files shrank by {result['disk_bytes'] / 1024:.1f} KiB",
+    ]
+    log(f"Compacted bot data: {result}")
+    await ctx.reply("\n".join(lines))
+
+
+@bot.command(name = "games_sweep", help = "(Admin-only) Remove finished and abandoned games now", hidden = True)
+@commands.before_invoke(wait_for_main_bot_data)
+async def games_sweep_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    async with ctx.typing():
+        result = await sweep_game_sessions()
+
+    log(f"Swept games: {result}")
+    await ctx.reply(f"Removed {result['removed']} of {result['checked']} games ({result['bytes'] / 1024:.1f} KiB), archived {result['archived']}.")
+
+
+@bot.command(name = "backups", help = "(Admin-only) List bot data backups", hidden = True)
+async def backups_command(ctx):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    backups = await asyncio.to_thread(backup_store.list)
+    if len(backups) < 1:
+        await ctx.reply("There are no backups yet.")
+        return
+
+    lines = []
+    for backup in backups[-20:]:
+        size = await asyncio.to_thread(backup_store.get_size, backup)
+        lines.append(f"{backup['id']}: {len(backup['files'])} files, {size // 1024} KiB")
+
+    string_to_send = "\n".join(lines)
+    await ctx.reply(f"```{string_to_send}```\nUse `{COMMAND_PREFIX}backup_restore <id>` to restore one.")
+
+
+@bot.command(name = "backup_restore", help = "(Admin-only) Restore bot data from a backup", hidden = True)
+@commands.before_invoke(wait_for_main_bot_data)
+async def backup_restore_command(ctx, backup_id: str):
+    if is_admin_user(ctx.author) is False:
+        await ctx.reply(NO_PERMISSION_ERROR_MESSAGE)
+        return
+
+    backup = await asyncio.to_thread(backup_store.get, backup_id)
+    if backup is None:
+        await ctx.reply(f"There is no backup `{backup_id}`.")
+        return
+
+    async with ctx.typing():
+        # Keep the current data around in case the restore was a mistake
+        await save_main_bot_data(backup = True)
+        async with data_lock:
+            await asyncio.to_thread(restore_main_bot_data, backup)
+
+    log(f"Restored bot data from backup {backup_id}")
+    await ctx.reply(f"Restored backup `{backup_id}`.")
+
+
 @bot.command(name = "say", help = "(Admin-only) Forces the bot to send the given message", hidden = True)
 async def say_command(ctx, message: str):
     if is_admin_user(ctx.author):
@@ -841,7 +4667,10 @@ async def status_command(ctx, status: str, message: str):
 @bot.command(name = "joke", help = "Drop a joke into the chat")
 async def joke_command(ctx):
     async with ctx.typing():
-        joke = http_get_json_generic("https://v2.jokeapi.dev/joke/Any?blacklistFlags=nsfw,religious,political,racist,sexist,explicit")
+        joke = await response_cache.get(JOKE_API_URL)
+
+    if joke is None:
+        raise ValueError("'joke' is not set")
 
     if joke["error"]:
         raise ValueError("'error' is set")
@@ -858,7 +4687,10 @@ async def joke_command(ctx):
 @bot.command(name = "quote", help = "Drop a wise quote into the chat")
 async def quote_command(ctx):
     async with ctx.typing():
-        quotes = http_get_json_generic("https://zenquotes.io/api/random")
+        quotes = await response_cache.get(QUOTE_API_URL)
+
+    if quotes is None:
+        raise ValueError("'quotes' is not set")
 
     quote = quotes[0]
     if quote is None:
@@ -873,18 +4705,13 @@ async def quote_command(ctx):
 @bot.command(name = "kitty", help = "Drop a cute kitty photo into the chat")
 async def kitty_command(ctx):
     async with ctx.typing():
-        response_json = http_get_json_generic("https://api.thecatapi.com/v1/images/search")
-
-    item = response_json[0]
-    if item is None:
-        raise ValueError("'item' is not set")
+        image = await image_prefetch_pools["kitty"].take()
 
-    url = item["url"]
-    if url is None:
-        raise ValueError("'url' is not set")
+    if image is None:
+        raise ValueError("'image' is not set")
 
     embed = discord.Embed(title = "Cat", color = COLOR_GRAY)
-    embed.set_image(url = url)
+    embed.set_image(url = image["url"])
 
     await ctx.send(embed = embed)
 
@@ -892,18 +4719,13 @@ async def kitty_command(ctx):
 @bot.command(name = "doggo", help = "Drop a cute dog photo into the chat")
 async def doggo_command(ctx):
     async with ctx.typing():
-        response_json = http_get_json_generic("https://api.thedogapi.com/v1/images/search")
-
-    item = response_json[0]
-    if item is None:
-        raise ValueError("'item' is not set")
+        image = await image_prefetch_pools["doggo"].take()
 
-    url = item["url"]
-    if url is None:
-        raise ValueError("'url' is not set")
+    if image is None:
+        raise ValueError("'image' is not set")
 
     embed = discord.Embed(title = "Dog", color = COLOR_RED)
-    embed.set_image(url = url)
+    embed.set_image(url = image["url"])
 
     await ctx.send(embed = embed)
 
@@ -911,22 +4733,14 @@ async def doggo_command(ctx):
 @bot.command(name = "penguin", help = "Drop a penguin photo into the chat")
 async def penguin_command(ctx):
     async with ctx.typing():
-        # From https://github.com/samSharivker/PenguinImageAPI
-        item = http_get_json_generic("https://penguin.sjsharivker.workers.dev/api")
-
-    if item is None:
-        raise ValueError("'item' is not set")
+        image = await image_prefetch_pools["penguin"].take()
 
-    url = item["img"]
-    species = item["species"]
-
-    if url is None:
-        raise ValueError("'url' is not set")
-    if species is None:
-        raise ValueError("'species' is not set")
+    if image is None:
+        raise ValueError("'image' is not set")
 
+    species = image["species"]
     embed = discord.Embed(title = "Penguin", description = f"**Species**: || {species} ||", color = COLOR_BLUE)
-    embed.set_image(url = url)
+    embed.set_image(url = image["url"])
 
     await ctx.send(embed = embed)
 
@@ -991,29 +4805,355 @@ async def fortune_command(ctx):
     await ctx.reply(embed = embed)
 
 
+#
+# A game of hangman. The word shown to players is kept as a list of
+# characters with `_` for the ones not guessed yet, and only the
+# positions of a newly guessed letter are filled in.
+#
+class HangmanSession(object):
+    __slots__ = ("word", "guesses", "guessed", "updated", "mask", "hidden")
+
+    def __init__(self, word: str, guesses: int, guessed: list[str], updated: int = None):
+        self.word = word
+        self.guesses = guesses
+        self.guessed = guessed
+        self.updated = updated
+        self.mask = ["_"] * len(word)
+        self.hidden = len(word)
+        for letter in guessed:
+            self.reveal(letter)
+
+    @staticmethod
+    def from_dict(game_dict: dict):
+        return HangmanSession(game_dict["word"], game_dict["guesses"], game_dict["guessed"], game_dict.get("updated"))
+
+    def to_dict(self) -> dict:
+        return {"word": self.word, "guesses": self.guesses, "guessed": list(self.guessed), "updated": self.updated}
+
+    def reveal(self, letter: str) -> int:
+        revealed = 0
+        for i in range(0, len(self.word)):
+            if self.word[i] == letter and self.mask[i] == "_":
+                self.mask[i] = letter
+                revealed += 1
+        self.hidden -= revealed
+        return revealed
+
+    # Returns whether the letter is in the word
+    def guess_letter(self, letter: str) -> bool:
+        self.guessed.append(letter)
+        if letter in self.word:
+            self.reveal(letter)
+            return True
+        self.guesses -= 1
+        return False
+
+    def get_word_to_show(self) -> str:
+        return "".join(self.mask)
+
+    def is_solved(self) -> bool:
+        return self.hidden == 0
+
+
+class WordleSession(object):
+    __slots__ = ("word", "guesses", "guessed", "updated", "rows")
+
+    def __init__(self, word: str, guesses: int, guessed: list[str], rows: list[str] = None, updated: int = None):
+        self.word = word
+        self.guesses = guesses
+        self.guessed = guessed
+        self.updated = updated
+        if rows is None:
+            # Games started before rows were stored
+            rows = [generate_wordle_board_row(word, guess) for guess in guessed]
+        self.rows = rows
+
+    @staticmethod
+    def from_dict(game_dict: dict):
+        return WordleSession(game_dict["word"], game_dict["guesses"], game_dict["guessed"], game_dict.get("rows"), game_dict.get("updated"))
+
+    def to_dict(self) -> dict:
+        return {"word": self.word, "guesses": self.guesses, "guessed": list(self.guessed), "rows": list(self.rows), "updated": self.updated}
+
+    # Only the new guess is scored, earlier rows are kept as they were shown
+    def guess_word(self, word_guess: str) -> None:
+        self.guessed.append(word_guess)
+        self.rows.append(generate_wordle_board_row(self.word, word_guess))
+        self.guesses -= 1
+
+
+#
+# Keeps the games of one kind that are in progress in memory, one
+# session per channel, loaded from bot data the first time they're used.
+#
+# Every turn must hold `lock(channel_id)`, the channel's sub-tree write
+# lock, from loading the session to saving it. Turns in one channel run
+# one at a time, while other channels aren't held up at all.
+# A session is written back to bot data as a whole at the end of each
+# turn, with `save()` or `finish()`. `save()` also records when the game
+# was last played, so `sweep()` can tell when it has been abandoned.
+#
+# A game that's won or lost is archived and removed by `finish()` in the
+# turn that ends it, since nothing reads it again and keeping it until
+# the next sweep would only hold on to its data. `sweep()` removes the
+# games nobody finished, and finished ones saved before games were
+# removed at all.
+#
+# Only the `GAME_SESSIONS_KEPT` most recently used sessions stay in
+# memory, since each is saved whole at the end of every turn. Sessions
+# are dropped when their data is changed by anything else, such as
+# restoring a backup, through the bot data's change listener. Sweeps run
+# on worker threads, so the session table has its own lock.
+#
+class GameSessionManager(object):
+    def __init__(self, game: str, load_session):
+        self.game = game
+        self.load_session = load_session
+        self.sessions = OrderedDict()
+        self.sessions_lock = threading.Lock()
+        self.dictionary = None
+        # Channels whose own save is being written, which `on_data_changed()`
+        # leaves alone. Saves for different channels can run at once from
+        # the event loop and the sweep thread.
+        self.saving = set()
+
+    def attach(self, dictionary) -> None:
+        self.dictionary = dictionary
+        with self.sessions_lock:
+            self.sessions.clear()
+        dictionary.add_change_listener(self.on_data_changed)
+
+    def on_data_changed(self, key_path: KeyPath | None) -> None:
+        if key_path is not None and key_path.parts[0] != self.game:
+            return
+        with self.sessions_lock:
+            if key_path is None or len(key_path.parts) < 2:
+                self.sessions.clear()
+            elif key_path.parts[1] not in self.saving:
+                self.sessions.pop(key_path.parts[1], None)
+
+    def remember(self, channel_id, session) -> None:
+        with self.sessions_lock:
+            self.sessions[str(channel_id)] = session
+            self.sessions.move_to_end(str(channel_id))
+            while len(self.sessions) > GAME_SESSIONS_KEPT:
+                self.sessions.popitem(last = False)
+
+    def forget(self, channel_id) -> None:
+        with self.sessions_lock:
+            self.sessions.pop(str(channel_id), None)
+
+    def get_base_key(self, channel_id) -> str:
+        return f"{self.game}.{channel_id}"
+
+    def lock(self, channel_id) -> ReadWriteLockHolder:
+        return self.dictionary.subtree_locks.writing(self.get_base_key(channel_id))
+
+    # Returns None if there's no game in the channel. Must hold `lock(channel_id)`
+    def get(self, channel_id):
+        with self.sessions_lock:
+            session = self.sessions.get(str(channel_id))
+        if session is not None:
+            return session
+
+        game_dict = self.dictionary.dictionary_get_copy(self.get_base_key(channel_id))
+        if isinstance(game_dict, dict) is False or game_dict.get("guesses") is None:
+            return None
+        session = self.load_session(game_dict)
+        self.remember(channel_id, session)
+        return session
+
+    # Starts a new game or saves the end of a turn. Must hold `lock(channel_id)`
+    def save(self, channel_id, session) -> None:
+        base_key = self.get_base_key(channel_id)
+        session.updated = int(time.time())
+        with self.sessions_lock:
+            self.saving.add(str(channel_id))
+        try:
+            with self.dictionary.batch() as batch:
+                game_dict = session.to_dict()
+                for key in game_dict.keys():
+                    batch.set(f"{base_key}.{key}", game_dict[key])
+        except Exception:
+            # The session may not match what's stored anymore
+            self.forget(channel_id)
+            raise
+        finally:
+            with self.sessions_lock:
+                self.saving.discard(str(channel_id))
+        self.remember(channel_id, session)
+
+    #
+    # A finished game isn't needed anymore, it's only added to the archive
+    # if there is one. `outcome` is "won", "lost", "expired", or
+    # "finished" for a game that ended before games were removed.
+    # Must hold `lock(channel_id)`.
+    #
+    def finish(self, channel_id, session, outcome: str) -> None:
+        if game_archive is not None:
+            record = {"game": self.game, "channel": str(channel_id), "outcome": outcome, "ended": int(time.time())}
+            record.update(session.to_dict())
+            game_archive.add(record)
+        self.forget(channel_id)
+        self.dictionary.dictionary_delete(self.get_base_key(channel_id))
+
+    #
+    # Removes the game in the channel if it's over or hasn't been played
+    # for `ttl` seconds. Returns the number of bytes of data removed, or
+    # None if the game was kept. Games from before play times were saved
+    # get one now, and expire `ttl` seconds later.
+    # Must hold `lock(channel_id)`, and not be called on the event loop.
+    #
+    def sweep(self, channel_id, now: float, ttl: float):
+        session = self.get(channel_id)
+        if session is None:
+            return None
+
+        if session.guesses < 1:
+            outcome = "finished"
+        elif session.updated is None:
+            self.save(channel_id, session)
+            return None
+        elif ttl > 0 and now - session.updated > ttl:
+            outcome = "expired"
+        else:
+            return None
+
+        size = len(json.dumps(session.to_dict(), separators = (',', ':')))
+        self.finish(channel_id, session, outcome)
+        return size
+
+    # Channels with a game in bot data, including shards that aren't loaded
+    def list_channels(self) -> list[str]:
+        channels = set()
+        games = self.dictionary.dictionary_get(self.game)
+        if isinstance(games, dict) is True:
+            channels.update(games.keys())
+
+        shards = getattr(self.dictionary, "shards", None)
+        if shards is not None:
+            for root, shard_id in list(shards.evicted.keys()):
+                if root == self.game:
+                    channels.add(shard_id)
+            root_dir = os.path.join(shards.dir_name, self.game)
+            if os.path.isdir(root_dir) is True:
+                for file_name in os.listdir(root_dir):
+                    if file_name.endswith(".json"):
+                        channels.add(file_name[:-len(".json")])
+        return sorted(channels)
+
+
+hangman_sessions = GameSessionManager("hangman", HangmanSession.from_dict)
+wordle_sessions = GameSessionManager("wordle", WordleSession.from_dict)
+
+
+#
+# Finished and expired games, appended to `file_name` as one line of
+# compact JSON each. Records are kept in memory until `flush()`, which
+# adds them all to the file as one more gzip member, so the file is
+# read with `gzip` like any other.
+#
+class GameArchive(object):
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def add(self, record: dict) -> None:
+        with self.lock:
+            self.pending.append(record)
+
+    # Returns the number of games written. Must not be called on the event loop
+    def flush(self) -> int:
+        with self.lock:
+            records = self.pending
+            self.pending = []
+        if len(records) < 1:
+            return 0
+
+        lines = "".join([json.dumps(record, separators = (',', ':')) + "\n" for record in records])
+        try:
+            with gzip.open(self.file_name, "at", encoding = "utf-8") as file:
+                file.write(lines)
+        except OSError:
+            # Kept for the next flush
+            with self.lock:
+                self.pending = records + self.pending
+            raise
+        return len(records)
+
+
+game_archive = GameArchive(GAME_ARCHIVE_FILE) if GAME_ARCHIVE_FILE != "" else None
+
+
+#
+# Removes games that are over or have been abandoned from bot data.
+# Each game is swept while holding its channel's lock, so a game that's
+# being played is never removed halfway through a turn.
+#
+async def sweep_game_sessions() -> dict:
+    now = time.time()
+    result = {"checked": 0, "removed": 0, "bytes": 0, "archived": 0}
+    for manager in (hangman_sessions, wordle_sessions):
+        channels = await asyncio.to_thread(manager.list_channels)
+        for channel_id in channels:
+            async with manager.lock(channel_id):
+                size = await asyncio.to_thread(manager.sweep, channel_id, now, GAME_SESSION_TTL_SECONDS)
+            result["checked"] += 1
+            if size is not None:
+                result["removed"] += 1
+                result["bytes"] += size
+
+    if game_archive is not None:
+        result["archived"] = await asyncio.to_thread(game_archive.flush)
+    return result
+
+
+async def sweep_game_sessions_periodically() -> None:
+    while True:
+        await asyncio.sleep(GAME_SWEEP_INTERVAL_SECONDS)
+        try:
+            result = await sweep_game_sessions()
+        except Exception as error:
+            log(f"Sweeping games failed: {error}")
+            continue
+        if result["removed"] > 0:
+            log(f"Swept {result['removed']} of {result['checked']} games, {result['bytes']} bytes, {result['archived']} archived")
+
+
 async def create_hangman_game_in_channel(channel, word):
     word = word.lower()
-    guesses = 4
-    base_key = f"hangman.{channel.id}"
-    main_bot_data.dictionary_set(f"{base_key}.word", word)
-    main_bot_data.dictionary_set(f"{base_key}.guesses", guesses)
-    main_bot_data.dictionary_set(f"{base_key}.guessed", [])
+    session = HangmanSession(word, 4, [])
+    async with hangman_sessions.lock(channel.id):
+        hangman_sessions.save(channel.id, session)
     await channel.send("Starting a game of hangman!")
-    word_to_show = generate_hangman_current_word(word, [])
-    await channel.send(f"`{word_to_show}` \nIncorrect Guesses Remaining: {guesses} \nUse `{COMMAND_PREFIX}letter <letter>` to guess a letter!")
+    await channel.send(f"`{session.get_word_to_show()}` \nIncorrect Guesses Remaining: {session.guesses} \nUse `{COMMAND_PREFIX}letter <letter>` to guess a letter!")
 
 
-@bot.command(name = "random_hangman", help = "Start a game of Hangman with a randomly chosen word")
-async def random_hangman_command(ctx):
+@bot.command(name = "random_hangman", help = "Start a game of Hangman with a randomly chosen word\nOptionally give a length like `6` or `5-8`, and `easy`, `medium` or `hard`")
+@commands.before_invoke(wait_for_main_bot_data_and_word_list)
+async def random_hangman_command(ctx, *options: str):
+    try:
+        min_length, max_length, difficulty = parse_word_options(options)
+    except ValueError as error:
+        await ctx.reply(str(error))
+        return
+
     async with ctx.typing():
-        if len(wordle_words) < 1:
+        if len(word_dictionary) < 1:
             await ctx.reply("Don't have any words to use! Sorry!")
             return
-        word = random.choice(wordle_words)
+        recent = recent_words.get(ctx.channel.id)
+        word = word_dictionary.pick_word(min_length, max_length, difficulty, exclude = recent)
+        if word is None:
+            await ctx.reply("I don't have any words like that! Try another length or difficulty.")
+            return
+        recent.append(word)
         await create_hangman_game_in_channel(ctx.channel, word)
 
 
 @bot.command(name = "hangman_channel", help = "Start a game of hangman in another channel")
+@commands.before_invoke(wait_for_main_bot_data)
 async def hangman_command(ctx, channel: int = None, word: str = None):
     async with ctx.typing():
         if channel is None:
@@ -1043,6 +5183,7 @@ async def hangman_command(ctx, channel: int = None, word: str = None):
 
 
 @bot.command(name = "letter", help = "Guess a letter for hangman")
+@commands.before_invoke(wait_for_main_bot_data)
 async def letter_command(ctx, letter: str):
     if len(letter) != 1 or letter.isalnum() is False:
         await ctx.send(random_error_message())
@@ -1050,59 +5191,43 @@ async def letter_command(ctx, letter: str):
         return
 
     async with ctx.typing():
-        base_key = f"hangman.{ctx.channel.id}"
-        hangman_dict = main_bot_data.dictionary_get(f"{base_key}")
-        guesses = hangman_dict.get("guesses")
-
-        if guesses is None or guesses < 1:
-            await ctx.reply(f"The game is over! Please start a new one.")
-            return
-
-        guessed = hangman_dict["guessed"]
-
-        letter = letter.lower()
-
-        if letter in guessed:
-            await ctx.reply(f"'**{letter}**' has already been guessed!")
-            return
-
-        word = hangman_dict["word"]
+        # Another guess in this channel can't change the game until this one is done
+        async with hangman_sessions.lock(ctx.channel.id):
+            session = hangman_sessions.get(ctx.channel.id)
 
-        if letter not in word:
-            guesses -= 1
-        guessed.append(letter)
+            if session is None or session.guesses < 1:
+                await ctx.reply(f"The game is over! Please start a new one.")
+                return
 
-        word_to_show = generate_hangman_current_word(word.lower(), guessed)
+            letter = letter.lower()
 
-        await ctx.reply(f"`{word_to_show}` \nIncorrect Guesses Remaining: {guesses}")
+            if letter in session.guessed:
+                await ctx.reply(f"'**{letter}**' has already been guessed!")
+                return
 
-        if word_to_show == word:
-            await ctx.reply("You win! Great Job!")
-            guesses = 0
-        elif guesses < 1:
-            await ctx.reply(f"You Lose! Better luck next time! \nThe word was: || {word} ||")
-            guesses = 0
+            session.guess_letter(letter)
 
-        main_bot_data.dictionary_set(f"{base_key}.guesses", guesses)
-        main_bot_data.dictionary_set(f"{base_key}.guessed", guessed)
+            # The turn is saved before anyone is told how it went
+            if session.is_solved() is True:
+                hangman_sessions.finish(ctx.channel.id, session, "won")
+            elif session.guesses < 1:
+                hangman_sessions.finish(ctx.channel.id, session, "lost")
+            else:
+                hangman_sessions.save(ctx.channel.id, session)
 
+            await ctx.reply(f"`{session.get_word_to_show()}` \nIncorrect Guesses Remaining: {session.guesses}")
 
-def generate_hangman_current_word(word, guessed):
-    word_to_show = word
-    for character in word:
-        if character not in guessed:
-            word_to_show = word_to_show.replace(character, "_")
-    return word_to_show
+            if session.is_solved() is True:
+                await ctx.reply("You win! Great Job!")
+            elif session.guesses < 1:
+                await ctx.reply(f"You Lose! Better luck next time! \nThe word was: || {session.word} ||")
 
 
 async def create_wordle_game_in_channel(channel, word):
     word = word.lower()
     length = len(word)
-    guesses = length + 1
-    base_key = f"wordle.{channel.id}"
-    main_bot_data.dictionary_set(f"{base_key}.word", word)
-    main_bot_data.dictionary_set(f"{base_key}.guesses", guesses)
-    main_bot_data.dictionary_set(f"{base_key}.guessed", [])
+    async with wordle_sessions.lock(channel.id):
+        wordle_sessions.save(channel.id, WordleSession(word, length + 1, []))
 
     embed = discord.Embed(title = "Wordle", color = COLOR_YELLOW)
 
@@ -1112,17 +5237,30 @@ async def create_wordle_game_in_channel(channel, word):
     await channel.send(embed = embed)
 
 
-@bot.command(name = "random_wordle", help = "Start a game of Wordle with a randomly chosen word")
-async def random_wordle_command(ctx):
+@bot.command(name = "random_wordle", help = "Start a game of Wordle with a randomly chosen word\nOptionally give a length like `6` or `5-8`, and `easy`, `medium` or `hard`")
+@commands.before_invoke(wait_for_main_bot_data_and_word_list)
+async def random_wordle_command(ctx, *options: str):
+    try:
+        min_length, max_length, difficulty = parse_word_options(options)
+    except ValueError as error:
+        await ctx.reply(str(error))
+        return
+
     async with ctx.typing():
-        if len(wordle_words) < 1:
+        if len(word_dictionary) < 1:
             await ctx.reply("Don't have any words to use! Sorry!")
             return
-        word = random.choice(wordle_words)
+        recent = recent_words.get(ctx.channel.id)
+        word = word_dictionary.pick_word(min_length, max_length, difficulty, exclude = recent)
+        if word is None:
+            await ctx.reply("I don't have any words like that! Try another length or difficulty.")
+            return
+        recent.append(word)
         await create_wordle_game_in_channel(ctx.channel, word)
 
 
 @bot.command(name = "wordle_channel", help = "Start a game of Wordle in another channel")
+@commands.before_invoke(wait_for_main_bot_data)
 async def wordle_channel_command(ctx, channel: int = None, word: str = None):
     async with ctx.typing():
         if channel is None:
@@ -1152,6 +5290,7 @@ async def wordle_channel_command(ctx, channel: int = None, word: str = None):
 
 
 @bot.command(name = "guess_word", help = "Guess the word for Wordle")
+@commands.before_invoke(wait_for_main_bot_data_and_word_list)
 async def wordle_guess_command(ctx, word_guess: str):
     if word_guess.isalnum() is False:
         await ctx.send(random_error_message())
@@ -1159,64 +5298,140 @@ async def wordle_guess_command(ctx, word_guess: str):
         return
 
     async with ctx.typing():
-        base_key = f"wordle.{ctx.channel.id}"
-        wordle_dict = main_bot_data.dictionary_get(f"{base_key}")
-        guesses = wordle_dict.get("guesses")
+        # Another guess in this channel can't change the game until this one is done
+        async with wordle_sessions.lock(ctx.channel.id):
+            session = wordle_sessions.get(ctx.channel.id)
 
-        if guesses is None or guesses < 1:
-            await ctx.reply(f"The game is over! Please start a new one.")
-            return
+            if session is None or session.guesses < 1:
+                await ctx.reply(f"The game is over! Please start a new one.")
+                return
 
-        word = wordle_dict["word"]
-        word_guess = word_guess.lower()
+            word = session.word
+            word_guess = word_guess.lower()
 
-        word_length = len(word)
-        guess_len = len(word_guess)
-        if guess_len != word_length:
-            await ctx.reply(f"The word is {word_length} characters long, try again!")
-            return
+            word_length = len(word)
+            guess_len = len(word_guess)
+            if guess_len != word_length:
+                await ctx.reply(f"The word is {word_length} characters long, try again!")
+                return
+
+            # Words given to `wordle_channel` don't have to be in the word list
+            if WORDLE_VALIDATE_GUESSES is True and len(word_dictionary) > 0 and word_guess != word and word_guess not in word_dictionary:
+                await ctx.reply(f"`{word_guess}` isn't in my word list, try another word!")
+                return
 
-        guessed = wordle_dict["guessed"]
-        guessed.append(word_guess)
-        guesses -= 1
+            session.guess_word(word_guess)
 
-        result_lines = []
-        for guess in guessed:
-            guess_response = generate_wordle_guess_response(word, guess)
-            result_lines.append(f"`{guess}` - `{guess_response}`")
-        result_to_show = "\n".join(result_lines)
+            # The turn is saved before anyone is told how it went
+            if word_guess == word:
+                wordle_sessions.finish(ctx.channel.id, session, "won")
+            elif session.guesses < 1:
+                wordle_sessions.finish(ctx.channel.id, session, "lost")
+            else:
+                wordle_sessions.save(ctx.channel.id, session)
 
-        guess_remaining_text = f"Guesses Remaining: {guesses}"
-        embed = discord.Embed(title = "Wordle Results", description = f"{guess_remaining_text}\n\n{result_to_show}", color = COLOR_YELLOW)
+            result_to_show = "\n".join(session.rows)
 
-        await ctx.reply(embed = embed)
+            guess_remaining_text = f"Guesses Remaining: {session.guesses}"
+            embed = discord.Embed(title = "Wordle Results", description = f"{guess_remaining_text}\n\n{result_to_show}", color = COLOR_YELLOW)
 
-        if word_guess == word:
-            win_embed = discord.Embed(title = f"You Win! Great Job! {EMOJI_PARTY_POPPER}", color = COLOR_GREEN)
-            await ctx.reply(embed = win_embed)
-            guesses = 0
-        elif guesses < 1:
-            lose_embed = discord.Embed(title = "Better luck next time!", description = f"The word was: || {word} ||", color = COLOR_GRAY)
-            await ctx.reply(embed = lose_embed)
-            guesses = 0
+            await ctx.reply(embed = embed)
 
-        main_bot_data.dictionary_set(f"{base_key}.guesses", guesses)
-        main_bot_data.dictionary_set(f"{base_key}.guessed", guessed)
+            if word_guess == word:
+                win_embed = discord.Embed(title = f"You Win! Great Job! {EMOJI_PARTY_POPPER}", color = COLOR_GREEN)
+                await ctx.reply(embed = win_embed)
+            elif session.guesses < 1:
+                lose_embed = discord.Embed(title = "Better luck next time!", description = f"The word was: || {word} ||", color = COLOR_GRAY)
+                await ctx.reply(embed = lose_embed)
 
 
-def generate_wordle_guess_response(word: str, guess: str):
-    response = ""
+#
+# Scores a guess against a word of the same length. Exact matches are
+# found first, then the remaining letters are only marked as present as
+# many times as the word has them left over. Guessing "keeps" for
+# "abbey" gets one yellow `e`, not two.
+#
+def score_wordle_guess(word: str, guess: str) -> list[int]:
+    scores = [WORDLE_ABSENT] * len(guess)
+    unmatched = {}
     for i in range(0, len(guess)):
         if guess[i] == word[i]:
-            response += EMOJI_GREEN_SQUARE
-        elif guess[i] in word:
-            response += EMOJI_YELLOW_SQUARE
+            scores[i] = WORDLE_CORRECT
         else:
-            response += EMOJI_BLACK_SQUARE
-    return response
+            unmatched[word[i]] = unmatched.get(word[i], 0) + 1
+
+    for i in range(0, len(guess)):
+        if scores[i] == WORDLE_CORRECT:
+            continue
+        count = unmatched.get(guess[i], 0)
+        if count > 0:
+            scores[i] = WORDLE_PRESENT
+            unmatched[guess[i]] = count - 1
+    return scores
+
+
+# The scores of a guess as one number, each letter's score times 3 to the power of its position
+def get_wordle_feedback_pattern(word: str, guess: str) -> int:
+    pattern = 0
+    weight = 1
+    for score in score_wordle_guess(word, guess):
+        pattern += score * weight
+        weight *= 3
+    return pattern
+
+
+def generate_wordle_guess_response(word: str, guess: str):
+    return "".join([WORDLE_SCORE_EMOJIS[score] for score in score_wordle_guess(word, guess)])
+
+
+def generate_wordle_board_row(word: str, guess: str) -> str:
+    return f"`{guess}` - `{generate_wordle_guess_response(word, guess)}`"
+
+
+@bot.command(name = "wordle_hint", help = "Suggest a good next guess for Wordle")
+@commands.before_invoke(wait_for_main_bot_data_and_word_list)
+async def wordle_hint_command(ctx):
+    async with wordle_sessions.lock(ctx.channel.id):
+        session = wordle_sessions.get(ctx.channel.id)
+
+    if session is None or session.guesses < 1:
+        await ctx.reply(f"There's no game going on here! Use `{COMMAND_PREFIX}random_wordle` to start one.")
+        return
+
+    word = session.word
+    guessed = list(session.guessed)
+    hints = get_wordle_hints()
+
+    reason = hints.get_unavailable_reason(len(word))
+    if reason is not None:
+        await ctx.reply(reason)
+        return
+
+    if hints.is_ready(len(word)) is False:
+        await ctx.reply("Working out hints for this word length for the first time, this may take a few minutes...")
+
+    async with ctx.typing():
+        try:
+            matrix = await hints.get_matrix(len(word))
+        except OSError as error:
+            log(f"Failed to build the Wordle hint matrix: {error}")
+            await ctx.reply("I couldn't work out any hints, sorry!")
+            return
+
+        remaining, suggestion = await asyncio.to_thread(hints.get_hint, matrix, ctx.channel.id, word, guessed)
+        if suggestion is None:
+            await ctx.reply("I'm out of ideas, this word isn't in my word list!")
+            return
+
+    suggested_word = matrix.bucket.get_word(suggestion)
+    if remaining == 1:
+        await ctx.reply(f"It has to be `{suggested_word}`!")
+        return
+    await ctx.reply(f"Try `{suggested_word}`! There are {remaining} words it could still be.")
 
 
 @bot.command(name = "quiz_create", help = "Create a quiz")
+@commands.before_invoke(wait_for_main_bot_data)
 async def quiz_create_command(ctx, name: str):
     async with ctx.typing():
         if user_has_permission_in_server(ctx.author.id, ctx.guild.id, "quiz_create") is not True:
@@ -1356,6 +5571,9 @@ def compute_printed_user(user):
     return f"<{user.name}>"
 
 
+startup_timer.phases["import"] = [0.0, time.perf_counter() - STARTUP_PERF_COUNTER]
+
+
 #
 # RUN
 #